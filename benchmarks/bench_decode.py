@@ -0,0 +1,63 @@
+'''
+Measure the per-call CPU of decoding and logging a large GetMonitorDetailByPowerstationId response: the previous
+path (r.json() with the stdlib and logging.debug of the whole decoded dict) against the current one (orjson when
+installed, body logged sampled and truncated from the raw bytes). Debug logging is enabled with a handler writing to
+memory, as on a staging box.
+
+usage: python benchmarks/bench_decode.py [calls] [inverters]
+'''
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gw_api  # noqa: E402
+from gw_fakeserver import FakeSemsServer  # noqa: E402
+
+
+def response(body):
+    r = requests.Response()
+    r._content = body
+    r.status_code = 200
+    r.encoding = 'utf-8'
+    return r
+
+
+def run(label, fn, calls):
+    start = time.process_time()
+    for _ in range(calls):
+        fn()
+    elapsed = time.process_time() - start
+    print("{0:<36} {1:>8.1f} us per call".format(label, elapsed * 1e6 / calls))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    inverters = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    fake = FakeSemsServer(inverters=inverters)
+    fake.httpd.server_close()
+    body = json.dumps({'msg': 'success', 'data': fake.dataGetMonitorDetailByPowerstationId('bench', {})}).encode()
+    print("payload {0} bytes, orjson {1}".format(len(body), 'installed' if gw_api.orjson else 'not installed'))
+
+    logging.basicConfig(level=logging.DEBUG, stream=io.StringIO())
+    api = gw_api.GoodWeApi('bench', 'user', 'secret', fast_json=True, log_sample=10, log_bytes=512)
+
+    def previous():
+        data = response(body).json()
+        logging.debug(data)
+
+    def current():
+        return api.decode('GetMonitorDetailByPowerstationId', response(body))
+
+    run('r.json() + logging.debug(data)', previous, calls)
+    run('fast decode + sampled logging', current, calls)
+
+
+if __name__ == '__main__':
+    main()
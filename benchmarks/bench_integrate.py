@@ -0,0 +1,47 @@
+'''
+Benchmark the NumPy day integration (gw_vector.integrateDay) against the loop in GoodWeApi.integrateDay on
+synthetic 5-minute power samples.
+
+usage: python benchmarks/bench_integrate.py [days]
+'''
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gw_vector  # noqa: E402
+from gw_api import GoodWeApi  # noqa: E402
+
+
+def syntheticDay(day):
+    pacs = []
+    for minute in range(0, 24 * 60, 5):
+        daylight = math.sin(math.pi * (minute - 360) / 840) if 360 <= minute <= 1200 else 0
+        pacs.append({'date': (day + timedelta(minutes=minute)).strftime("%m/%d/%Y %H:%M:%S"),
+                     'pac': round(4000 * daylight)})
+    return pacs
+
+
+def run(label, fn, days):
+    start = time.perf_counter()
+    for day, pacs in days:
+        fn(day, 25.0, pacs)
+    elapsed = time.perf_counter() - start
+    print("{0:<20} {1:>8.1f} ms  ({2:.1f} us per day)".format(label, elapsed * 1000, elapsed * 1e6 / len(days)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    first = datetime(2019, 1, 1)
+    days = [(first + timedelta(days=n), syntheticDay(first + timedelta(days=n))) for n in range(count)]
+    print("{0} days of {1} samples".format(count, len(days[0][1])))
+
+    api = GoodWeApi('bench', 'user', 'secret')
+    run('loop', api.integrateDay, days)
+    run('numpy', gw_vector.integrateDay, days)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+'''
+Load test GoodWeApi against the local fake SEMS server (gw_fakeserver). A mix of getCurrentReadings, getDayReadings
+and getRawPs* calls is driven from a thread pool at the given concurrency, after which the latency percentiles, the
+throughput and the number of logins per 1000 calls are reported.
+
+usage: python benchmarks/bench_load.py [--calls N] [--concurrency N] [--latency S] [--error-rate F]
+                                       [--null-rate F] [--token-ttl S]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gw_api import GoodWeApi  # noqa: E402
+from gw_fakeserver import FakeSemsServer  # noqa: E402
+from gw_retry import RetryPolicy  # noqa: E402
+
+RAW_METHODS = ['getRawPsMonitorDetailByPowerstationId', 'getRawPsPowerFlow', 'getRawPsSoc',
+               'getRawPsPowerstationById', 'getRawPsInvertersByPowerStationId', 'getRawPsKpiByPowerStationId',
+               'getRawPsTime', 'getRawPsOnlyBps', 'getRawPsIsStoredInverter', 'getRawPsIsStoredPowerStation']
+
+
+def workload(api, n):
+    '''
+    workload returns the operation for call n: 45% getCurrentReadings, 10% getDayReadings, the rest getRawPs*.
+    '''
+    choice = n % 20
+    if choice < 9:
+        return 'getCurrentReadings', api.getCurrentReadings
+    if choice < 11:
+        day = datetime(2019, 1, 1) + timedelta(days=n % 365)
+        return 'getDayReadings', lambda: api.getDayReadings(day)
+    method = RAW_METHODS[n % len(RAW_METHODS)]
+    return method, getattr(api, method)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--stations', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--null-rate', type=float, default=0.0)
+    parser.add_argument('--token-ttl', type=float, default=3600)
+    args = parser.parse_args()
+
+    with FakeSemsServer(latency=args.latency, jitter=args.jitter, errorRate=args.error_rate,
+                        nullRate=args.null_rate, tokenTtl=args.token_ttl) as server:
+        api = GoodWeApi('station-0', 'user', 'secret', pool_maxsize=args.concurrency,
+                        retry=RetryPolicy(base=0.05, cap=0.5))
+        api.global_url = api.base_url = server.url
+        stations = [api.forStation('station-{0}'.format(n)) for n in range(args.stations)]
+        latencies = defaultdict(list)
+
+        def run(n):
+            name, operation = workload(random.choice(stations), n)
+            start = time.perf_counter()
+            operation()
+            latencies[name].append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(run, range(args.calls)))
+        elapsed = time.perf_counter() - started
+        stats = server.stats()
+
+    everything = [latency for values in latencies.values() for latency in values]
+    print("{0:<40} {1:>7} {2:>9} {3:>9}".format('operation', 'calls', 'p50 ms', 'p99 ms'))
+    for name in sorted(latencies):
+        values = latencies[name]
+        print("{0:<40} {1:>7} {2:>9.1f} {3:>9.1f}".format(name, len(values), percentile(values, 0.5) * 1000,
+                                                           percentile(values, 0.99) * 1000))
+    print("{0:<40} {1:>7} {2:>9.1f} {3:>9.1f}".format('all', len(everything), percentile(everything, 0.5) * 1000,
+                                                       percentile(everything, 0.99) * 1000))
+    print()
+    print("operations/s        {0:.1f}".format(args.calls / elapsed))
+    print("api calls/s         {0:.1f}".format(stats.get('calls', 0) / elapsed))
+    print("logins / 1000 calls {0:.2f}".format(1000.0 * stats.get('logins', 0) / max(stats.get('calls', 0), 1)))
+    print("server              {0}".format({key: value for key, value in stats.items() if key != 'endpoints'}))
+    print("client retries      {0}".format(api.retry.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''
+Compare parsing a GetMonitorDetailByPowerstationId response with GoodWeApi.parseCurrentReadings (dict digging and
+parseValue) against the compiled gw_schema extractor, in time and allocated memory per response, for the first
+inverter and for all four inverters of the response.
+
+usage: python benchmarks/bench_parse.py [calls]
+'''
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gw_schema  # noqa: E402
+from gw_api import GoodWeApi  # noqa: E402
+from gw_fakeserver import FakeSemsServer  # noqa: E402
+
+
+def run(label, fn, data, calls, repeat=5):
+    # the best of repeat runs, the others mostly measure noise of the machine
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(data)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    results = [fn(data) for _ in range(100)]
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    print("{0:<28} {1:>7.2f} us per response, {2:>5.0f} bytes retained per result".format(
+        label, elapsed * 1e6 / calls, allocated / 100.0))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    logging.disable(logging.INFO)
+
+    fake = FakeSemsServer(inverters=4)
+    fake.httpd.server_close()
+    data = fake.dataGetMonitorDetailByPowerstationId('bench', {})
+    api = GoodWeApi('bench', 'user', 'secret')
+
+    run('parseCurrentReadings', api.parseCurrentReadings, data, calls)
+    run('CURRENT_READINGS.extract', gw_schema.CURRENT_READINGS.extract, data, calls)
+    run('parseCurrentReadings all', lambda response: api.parseCurrentReadings(response, allInverters=True), data,
+        calls)
+    run('CURRENT_READINGS_ALL.extract', gw_schema.CURRENT_READINGS_ALL.extract, data, calls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+'''
+Benchmark the pooled keep-alive session of GoodWeApi against the previous one-connection-per-request behaviour
+(module-level requests.post). Both run against the local FakeSemsServer so only the connection handling differs.
+
+usage: python benchmarks/bench_session.py [calls]
+
+The fake server speaks plain http on localhost, so the measured gain only covers the TCP handshake; against
+globalapi.sems.com.cn every avoided connection also saves a TLS handshake and the gap is considerably larger.
+'''
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gw_api import GoodWeApi  # noqa: E402
+from gw_fakeserver import FakeSemsServer  # noqa: E402
+
+
+def run(label, fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    print("{0:<28} {1:>8.0f} req/s  ({2} calls in {3:.2f}s)".format(label, calls / elapsed, calls, elapsed))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with FakeSemsServer() as server:
+        url = server.url
+        api = GoodWeApi('fake', 'user', 'secret')
+        api.global_url = api.base_url = url
+        payload = {'powerStationId': 'fake'}
+        # log in before timing, so both runs only do GetSoc requests
+        api.login()
+        headers = {'Token': api.token}
+
+        run('requests.post per call', lambda: requests.post(url + 'v1/PowerStation/GetSoc', data=payload,
+                                                            headers=headers, timeout=10), calls)
+        run('GoodWeApi pooled session', lambda: api.call('v1/PowerStation/GetSoc', payload), calls)
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+''' adaptive polling of power stations, driven by station state and daylight '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+def sunTimes(latitude, longitude, when=None):
+    '''
+    sunTimes returns the sunrise and sunset (epoch seconds, UTC) of the solar day around when for the given
+    position, using the sunrise equation. Where the sun does not set it returns (None, None) with up True, where it
+    does not rise (None, None) with up False; the third element of the result is that flag.
+    '''
+    when = time.time() if when is None else when
+    julianDay = when / 86400.0 + 2440587.5
+    # the solar day of the station, not of Greenwich: shift by the longitude before rounding
+    n = round(julianDay - 2451545.0 + 0.0008 + longitude / 360.0)
+    meanSolarNoon = n - longitude / 360.0
+    anomaly = math.radians((357.5291 + 0.98560028 * meanSolarNoon) % 360)
+    center = 1.9148 * math.sin(anomaly) + 0.02 * math.sin(2 * anomaly) + 0.0003 * math.sin(3 * anomaly)
+    eclipticLongitude = math.radians((math.degrees(anomaly) + center + 180 + 102.9372) % 360)
+    transit = 2451545.0 + meanSolarNoon + 0.0053 * math.sin(anomaly) - 0.0069 * math.sin(2 * eclipticLongitude)
+    declination = math.asin(math.sin(eclipticLongitude) * math.sin(math.radians(23.4397)))
+
+    phi = math.radians(latitude)
+    cosHourAngle = (math.sin(math.radians(-0.833)) - math.sin(phi) * math.sin(declination)) / \
+        (math.cos(phi) * math.cos(declination))
+    if cosHourAngle < -1:
+        return None, None, True
+    if cosHourAngle > 1:
+        return None, None, False
+
+    hourAngle = math.degrees(math.acos(cosHourAngle))
+    toEpoch = lambda julian: (julian - 2440587.5) * 86400.0
+    return toEpoch(transit - hourAngle / 360.0), toEpoch(transit + hourAngle / 360.0), True
+
+
+def isDaylight(latitude, longitude, when=None, margin=1800):
+    '''
+    isDaylight tells whether when lies between sunrise - margin and sunset + margin seconds.
+    '''
+    when = time.time() if when is None else when
+    sunrise, sunset, up = sunTimes(latitude, longitude, when)
+    if sunrise is None:
+        return up
+    return sunrise - margin <= when <= sunset + margin
+
+
+def readingValue(reading, key):
+    if isinstance(reading, dict):
+        return reading.get(key)
+    return getattr(reading, key, None)
+
+
+class AdaptiveScheduler:
+    '''
+    AdaptiveScheduler picks the polling interval of a station from its last reading (as returned by
+    getCurrentReadings, a dict or a gw_schema record):
+      - slowInterval while the station is offline, produces nothing, or it is dark at its latitude / longitude
+      - fastInterval while the power changes by more than fastChange W between polls
+      - interval otherwise
+    Sunrise and sunset are computed locally from the station position, margin seconds around them count as light.
+
+    requestsPerMinute is a budget for all stations together: when the chosen intervals add up to more polls per
+    minute than that, all intervals are stretched by the same factor.
+    '''
+
+    def __init__(self, interval=60, fastInterval=30, slowInterval=900, fastChange=250, requestsPerMinute=None,
+                 margin=1800):
+        self.interval = interval
+        self.fastInterval = fastInterval
+        self.slowInterval = slowInterval
+        self.fastChange = fastChange
+        self.requestsPerMinute = requestsPerMinute
+        self.margin = margin
+        self.desired = {}
+        self.lastPower = {}
+        self.positions = {}
+        self.lock = threading.Lock()
+
+    def desiredInterval(self, station, reading, now):
+        latitude = readingValue(reading, 'latitude')
+        longitude = readingValue(reading, 'longitude')
+        if latitude is not None and longitude is not None:
+            self.positions[station] = (float(latitude), float(longitude))
+
+        power = readingValue(reading, 'pgrid_w') or 0
+        lastPower = self.lastPower.get(station)
+        self.lastPower[station] = power
+
+        if station in self.positions and not isDaylight(*self.positions[station], when=now, margin=self.margin):
+            return self.slowInterval
+        if readingValue(reading, 'status') == 'Offline' or (not power and not lastPower):
+            return self.slowInterval
+        if lastPower is not None and abs(power - lastPower) > self.fastChange:
+            return self.fastInterval
+        return self.interval
+
+    def budgetFactor(self):
+        if not self.requestsPerMinute or not self.desired:
+            return 1.0
+        rate = sum(60.0 / interval for interval in self.desired.values())
+        return max(1.0, rate / self.requestsPerMinute)
+
+    def nextInterval(self, station, reading, now=None):
+        '''
+        nextInterval returns the number of seconds until station should be polled again. A reading of None (failed
+        poll) keeps the previous interval.
+        '''
+        now = time.time() if now is None else now
+        with self.lock:
+            if reading is not None:
+                self.desired[station] = self.desiredInterval(station, reading, now)
+            else:
+                self.desired.setdefault(station, self.interval)
+            return self.desired[station] * self.budgetFactor()
+
+
+class AdaptivePoller:
+    '''
+    AdaptivePoller polls stations (see GoodWeApi.forStation) with getCurrentReadings, each on the interval the
+    AdaptiveScheduler chooses for it after every poll. The polls run on a thread pool, callback(system_id, reading)
+    is called for every successful poll.
+    '''
+
+    def __init__(self, api, station_ids, scheduler=None, workers=8, callback=None):
+        self.stations = dict((station_id, api.forStation(station_id)) for station_id in station_ids)
+        self.scheduler = scheduler if scheduler is not None else AdaptiveScheduler()
+        self.workers = workers
+        self.callback = callback
+        self.queue = []
+        self.polls = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.stopped = False
+
+    def schedule(self, station_id, due):
+        with self.wakeup:
+            heapq.heappush(self.queue, (due, station_id))
+            self.wakeup.notify()
+
+    def poll(self, station_id):
+        reading = None
+        try:
+            reading = self.stations[station_id].getCurrentReadings()
+        except Exception as exp:
+            logging.warning("Poll of station {0} failed: {1!r}".format(station_id, exp))
+
+        if reading is not None and self.callback is not None:
+            self.callback(station_id, reading)
+        with self.lock:
+            self.polls += 1
+        self.schedule(station_id, time.time() + self.scheduler.nextInterval(station_id, reading))
+
+    def run(self, duration=None):
+        '''
+        run polls until stop() is called or, when given, duration seconds have passed. The first polls are spread
+        over the normal interval of the scheduler.
+        '''
+        started = time.time()
+        for n, station_id in enumerate(self.stations):
+            self.schedule(station_id, started + self.scheduler.interval * n / len(self.stations))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            with self.wakeup:
+                while not self.stopped and (duration is None or time.time() < started + duration):
+                    timeout = self.queue[0][0] - time.time() if self.queue else None
+                    if duration is not None:
+                        remaining = started + duration - time.time()
+                        timeout = remaining if timeout is None else min(timeout, remaining)
+                    if timeout is not None and timeout > 0:
+                        self.wakeup.wait(timeout)
+                        continue
+                    if not self.queue:
+                        self.wakeup.wait()
+                        continue
+                    due, station_id = heapq.heappop(self.queue)
+                    executor.submit(self.poll, station_id)
+                self.stopped = True
+
+    def stop(self):
+        with self.wakeup:
+            self.stopped = True
+            self.wakeup.notify()
@@ -1,8 +1,25 @@
+import copy
+import itertools
 import json
 import logging
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import gw_schema
+import gw_vector
+from gw_metrics import CallHooks, takeConnectionTimings
+from gw_readings import Readings
+from gw_retry import RetryPolicy
+from gw_token import TokenManager
 
 ''' this work is based upon the groundwork done by Mark Ruys on his original GW_API  '''
 __author__ = "Johan Louwers"
@@ -13,19 +30,110 @@ __email__ = "louwersj@gmail.com"
 
 class GoodWeApi:
 
-    def __init__(self, system_id, account, password):
+    # outcomes of a response, see classify
+    DONE = 'done'
+    LOGIN = 'login'
+    RETRY = 'retry'
+
+    def __init__(self, system_id, account, password, pool_connections=4, pool_maxsize=10, pool_block=False,
+                 session=None, tokens=None, token_path=None, retry=None, cache=None, hooks=None, fast_json=False,
+                 log_sample=1, log_bytes=2048, limiter=None, priority='live'):
+        '''
+        The client owns a requests.Session so that all calls (including the CrossLogin) reuse pooled keep-alive
+        connections instead of paying a fresh TCP+TLS handshake per request.
+
+        pool_connections sets the number of per-host connection pools that are cached (the global api and the
+        regional api returned by CrossLogin are separate hosts), pool_maxsize the number of connections kept per
+        host. With pool_block set to True pool_maxsize becomes a hard per-host connection limit and callers wait
+        for a free connection. An existing session can be passed in to share one pool between several clients.
+
+        The token and the api url are kept in a TokenManager, pass an existing one as tokens to share the login of an
+        account between clients. With token_path the token is kept in that file and survives a restart.
+
+        retry is the RetryPolicy used by call, clients made with forStation share it (and its retry budget).
+
+        cache is an optional ResponseCache. Responses of near static endpoints are then served from memory until
+        their ttl expires, clients made with forStation share the cache.
+
+        hooks receives the timings and outcome of every request, see gw_metrics.CallHooks and gw_metrics.Metrics.
+
+        With fast_json responses are decoded with orjson when it is installed. At debug level one in every
+        log_sample response bodies is logged, truncated to log_bytes, log_sample 0 disables body logging.
+
+        limiter is an optional gw_ratelimit.RequestScheduler every request waits for, with the given priority ('live',
+        'interactive' or 'backfill').
+        '''
         self.system_id = system_id
         self.account = account
         self.password = password
-        self.token = '{"version":"v2.0.4","client":"ios","language":"en"}'
-        self.global_url = 'https://globalapi.sems.com.cn/api/'
-        self.base_url = self.global_url
+        self.tokens = tokens if tokens is not None else TokenManager(account, password, path=token_path)
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.cache = cache
+        self.hooks = hooks if hooks is not None else CallHooks()
+        self.fast_json = fast_json
+        self.log_sample = log_sample
+        self.log_bytes = log_bytes
+        self.logCounter = itertools.count()
+        self.limiter = limiter
+        self.priority = priority
         self.status = {-1: 'Offline', 1: 'Normal'}
+        self.session = session if session is not None else self.createSession(pool_connections, pool_maxsize,
+                                                                               pool_block)
+
+    token = property(lambda self: self.tokens.token, lambda self, value: setattr(self.tokens, 'token', value))
+    base_url = property(lambda self: self.tokens.base_url, lambda self, value: setattr(self.tokens, 'base_url', value))
+    global_url = property(lambda self: self.tokens.global_url,
+                          lambda self, value: setattr(self.tokens, 'global_url', value))
+
+    def forStation(self, system_id):
+        '''
+        forStation returns a client for another power station of the same account. The new client shares the
+        session (connection pool) and the token of this client, so no extra login is needed.
+        '''
+        station = copy.copy(self)
+        station.system_id = system_id
+        return station
 
-    def getCurrentReadings(self):
+    def withPriority(self, priority):
+        '''
+        withPriority returns a client for the same station whose requests are admitted by the limiter with the given
+        priority, for example api.withPriority('backfill').getDayReadings(date).
+        '''
+        client = copy.copy(self)
+        client.priority = priority
+        return client
+
+    @staticmethod
+    def createSession(pool_connections=4, pool_maxsize=10, pool_block=False):
+        '''
+        createSession builds a requests.Session with a sized connection pool mounted for both http and https.
+        '''
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        '''
+        close releases all pooled connections held by the session.
+        '''
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def getCurrentReadings(self, allInverters=False, typed=False):
         """
         Download the most recent readings from the GoodWe API.
         :return:
+
+        The result holds the readings of the first inverter of the station, with allInverters set the readings of
+        every inverter are added as a list under 'inverters'. With typed set the result is a gw_schema record
+        (CurrentReadings, or CurrentReadingsAll with allInverters) instead of a dict.
         """
 
 
@@ -36,6 +144,25 @@ class GoodWeApi:
         # goodwe_server
         data = self.call("v1/PowerStation/GetMonitorDetailByPowerstationId", payload)
 
+        if typed:
+            return (gw_schema.CURRENT_READINGS_ALL if allInverters else gw_schema.CURRENT_READINGS).extract(data)
+        return self.parseCurrentReadings(data, allInverters)
+
+    def parseCurrentReadings(self, data, allInverters=False):
+        '''
+        parseCurrentReadings builds the getCurrentReadings result from a GetMonitorDetailByPowerstationId response.
+        For a response without inverters, such as the empty dict call returns for data null or a failed call, all
+        readings are None (and inverters an empty list).
+        '''
+        if not data.get('inverter'):
+            logging.warning("Received bad data " + str(data))
+            result = dict((key, None) for key in ('status', 'pgrid_w', 'eday_kwh', 'etotal_kwh', 'grid_voltage'))
+            result['latitude'] = data.get('info', {}).get('latitude')
+            result['longitude'] = data.get('info', {}).get('longitude')
+            if allInverters:
+                result['inverters'] = []
+            return result
+
         inverterData = data['inverter'][0]
 
         result = {
@@ -48,6 +175,16 @@ class GoodWeApi:
             'longitude': data['info'].get('longitude')
         }
 
+        if allInverters:
+            result['inverters'] = [{
+                'sn': inverter.get('sn'),
+                'status': self.status.get(inverter['status'], inverter['status']),
+                'pgrid_w': inverter['out_pac'],
+                'eday_kwh': inverter['eday'],
+                'etotal_kwh': inverter['etotal'],
+                'grid_voltage': self.parseValue(inverter['output_voltage'], 'V')
+            } for inverter in data['inverter']]
+
         message = "{status}, {pgrid_w} W now, {eday_kwh} kWh today".format(**result)
         if result['status'] == 'Normal' or result['status'] == 'Offline':
             logging.info(message)
@@ -135,6 +272,15 @@ class GoodWeApi:
 
 
 
+    def getPowerFlow(self):
+        '''
+        getPowerFlow returns the response of getRawPsPowerFlow parsed into a gw_schema PowerFlow record, with the
+        "1200(W)" style strings converted to numbers.
+        '''
+        return gw_schema.POWER_FLOW.extract(self.getRawPsPowerFlow())
+
+
+
     def getRawPsEnergyStatisticsCharts(self):
         '''
         TODO HAS A BUG WHICH NEED TO BE FIXED... IT REQUIRES MORE INPUT PARAMETERS
@@ -228,6 +374,7 @@ class GoodWeApi:
             someVariable['inverter'][0]['sn']
             someVariable['inverter'][0]['type']
          providing the two above mentioned datapoints should enable you to retrieve the required information.
+         For stations with more than one inverter use getRawPsInvertersBySn.
          '''
 
         apiPayload = {
@@ -261,6 +408,7 @@ class GoodWeApi:
            someVariable['inverter'][0]['sn']
            someVariable['inverter'][0]['type']
         providing the two above mentioned datapoints should enable you to retrieve the required information.
+        For stations with more than one inverter use getRawPsInverterKvsBySn.
         '''
 
         apiPayload = {
@@ -275,6 +423,46 @@ class GoodWeApi:
 
 
 
+    def getRawPsInvertersBySn(self, inverters=None, parallelism=4):
+        '''
+        getRawPsInvertersBySn is the batch variant of getRawPsInverterBySn: it calls /v1/PowerStation/GetInverterBySn
+        for every inverter of the station, at most parallelism calls at the same time, and returns the raw responses
+        keyed by serial number.
+
+        inverters is a list of (serial number, type) tuples or of dicts with 'sn' and 'type' as found in the responses
+        of getRawPsInvertersByPowerStationId and getRawPsMonitorDetailByPowerstationId. When it is not given the list
+        is taken from getRawPsInvertersByPowerStationId.
+        '''
+        return self.batchBySn(self.getRawPsInverterBySn, inverters, parallelism)
+
+
+
+    def getRawPsInverterKvsBySn(self, inverters=None, parallelism=4):
+        '''
+        getRawPsInverterKvsBySn is the batch variant of getRawPsInverterKvBySn, see getRawPsInvertersBySn.
+        '''
+        return self.batchBySn(self.getRawPsInverterKvBySn, inverters, parallelism)
+
+
+
+    def inverterList(self, inverters=None):
+        '''
+        inverterList returns the (serial number, type) tuples of the given inverters, or of all inverters of the
+        station when none are given.
+        '''
+        if inverters is None:
+            inverters = self.getRawPsInvertersByPowerStationId() or []
+        return [(inverter.get('sn'), inverter.get('type')) if isinstance(inverter, dict) else tuple(inverter)
+                for inverter in inverters]
+
+    def batchBySn(self, method, inverters, parallelism):
+        inverters = self.inverterList(inverters)
+        with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(inverters) or 1))) as executor:
+            responses = executor.map(lambda inverter: method(*inverter), inverters)
+            return dict(zip([serial for serial, inverterType in inverters], responses))
+
+
+
     def getRawPsKpiByPowerStationId(self):
         '''
         getRawPsKpiByPowerStationId is used to obtain the raw data from the Goodwe API endpoint without any
@@ -511,97 +699,322 @@ class GoodWeApi:
         return apiResponse
 
 
-    def getDayReadings(self, date):
+    def getDayReadings(self, date, raw=False, columns=False, compact=False):
+        '''
+        getDayReadings returns the power readings of one day with the cumulative energy per sample, plus the station
+        latitude and longitude. With raw set the result also holds the day yield reported by the api (eday_kwh) and
+        the unprocessed power samples (pacs), as needed to store the day (see gw_history). With columns set the entries
+        are returned column oriented as computed by gw_vector.integrateDay, with compact set as a Readings container.
+        '''
         date_s = date.strftime('%Y-%m-%d')
+        detail = self.call(*self.dayReadingsCalls(date_s)[0])
+        day = self.fetchDay(date_s) if 'info' in detail else None
+        return self.dayResult(date, detail, day, raw, columns, compact)
 
-        payload = {
-            'powerStationId': self.system_id
-        }
-        data = self.call("v1/PowerStation/GetMonitorDetailByPowerstationId", payload)
-        if 'info' not in data:
-            logging.warning(date_s + " - Received bad data " + str(data))
-            return result
+    def dayResult(self, date, detail, day, raw=False, columns=False, compact=False):
+        '''
+        dayResult builds the getDayReadings result from the station detail response and the (eday_kwh, pacs) tuple
+        of fetchDay.
+        '''
+        if 'info' not in detail:
+            logging.warning(date.strftime('%Y-%m-%d') + " - Received bad data " + str(detail))
+            return {'latitude': None, 'longitude': None, 'entries': Readings() if compact else []}
 
         result = {
-            'latitude': data['info'].get('latitude'),
-            'longitude': data['info'].get('longitude'),
-            'entries': []
+            'latitude': detail['info'].get('latitude'),
+            'longitude': detail['info'].get('longitude'),
+            'entries': Readings() if compact else []
         }
 
-        payload = {
-            'powerstation_id': self.system_id,
-            'count': 1,
-            'date': date_s
-        }
-        data = self.call("PowerStationMonitor/GetPowerStationPowerAndIncomeByDay", payload)
-        if len(data) == 0:
-            logging.warning(date_s + " - Received bad data " + str(data))
+        if day is None:
             return result
 
-        eday_kwh = data[0]['p']
-
-        payload = {
-            'id': self.system_id,
-            'date': date_s
-        }
-        data = self.call("PowerStationMonitor/GetPowerStationPacByDayForApp", payload)
-        if 'pacs' not in data:
-            logging.warning(date_s + " - Received bad data " + str(data))
+        eday_kwh, pacs = day
+        if raw:
+            result['eday_kwh'] = eday_kwh
+        if pacs is None:
             return result
 
+        if raw:
+            result['pacs'] = [{'date': sample['date'], 'pac': sample['pac']} for sample in pacs]
+        if compact:
+            result['entries'] = Readings.fromColumns(gw_vector.integrateDay(date, eday_kwh, pacs))
+        elif columns:
+            result['entries'] = gw_vector.integrateDay(date, eday_kwh, pacs)
+        else:
+            result['entries'] = self.integrateDay(date, eday_kwh, pacs)
+        return result
+
+    def fetchDay(self, date_s):
+        '''
+        fetchDay fetches the day yield and the power samples of one day given as a YYYY-MM-DD string. It returns the
+        tuple (eday_kwh, pacs), with pacs None when the api returned no samples, or None when it returned no yield.
+        '''
+        incomeCall, pacCall = self.dayReadingsCalls(date_s)[1:]
+
+        income = self.call(*incomeCall)
+        pacs = self.call(*pacCall) if len(income) else {}
+        return self.parseDay(date_s, income, pacs)
+
+    @staticmethod
+    def parseDay(date_s, income, pacs):
+        '''
+        parseDay turns the GetPowerStationPowerAndIncomeByDay and GetPowerStationPacByDayForApp responses into the
+        result of fetchDay.
+        '''
+        if len(income) == 0:
+            logging.warning(date_s + " - Received bad data " + str(income))
+            return None
+        if 'pacs' not in pacs:
+            logging.warning(date_s + " - Received bad data " + str(pacs))
+            return income[0]['p'], None
+        return income[0]['p'], pacs['pacs']
+
+    def iterReadings(self, start, end, prefetch=2, location=False):
+        '''
+        iterReadings yields the readings of every day from start to end (inclusive, datetime objects at midnight) one
+        sample at a time, in the format of the getDayReadings entries. With location set the station detail is
+        requested once, next to the first days, and the first item yielded is {'latitude': .., 'longitude': ..};
+        without it no station detail is requested.
+
+        While the caller works through a day the next prefetch days are fetched in the background, so at most
+        prefetch + 1 days are held in memory whatever the length of the range. Fetches that have not started yet when
+        the caller stops early are cancelled.
+        '''
+        days = (start + timedelta(days=n) for n in range((end - start).days + 1))
+        executor = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+        try:
+            detail = executor.submit(self.getRawPsMonitorDetailByPowerstationId) if location else None
+            pending = deque((day, executor.submit(self.fetchDay, day.strftime('%Y-%m-%d')))
+                            for day in itertools.islice(days, prefetch + 1))
+            if detail is not None:
+                yield self.locationOf(start, detail.result())
+
+            while pending:
+                day, future = pending.popleft()
+                result = future.result()
+                if result is not None and result[1] is not None:
+                    for entry in self.integrateDay(day, result[0], result[1]):
+                        yield entry
+                # the next day is only requested once this one is done with
+                result = future = None
+                for nextDay in itertools.islice(days, 1):
+                    pending.append((nextDay, executor.submit(self.fetchDay, nextDay.strftime('%Y-%m-%d'))))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def locationOf(self, date, detail):
+        '''
+        locationOf returns the latitude and longitude of a station detail response as the first item of iterReadings.
+        '''
+        result = self.dayResult(date, detail, None)
+        return {'latitude': result['latitude'], 'longitude': result['longitude']}
+
+    def dayReadingsCalls(self, date_s):
+        '''
+        dayReadingsCalls returns the three (endpoint, payload) pairs getDayReadings needs for the date given as a
+        YYYY-MM-DD string: the station detail (for latitude / longitude), the day yield and the power curve. The calls
+        are independent of each other, which allows the async client to issue them concurrently.
+        '''
+        return (
+            ("v1/PowerStation/GetMonitorDetailByPowerstationId", {'powerStationId': self.system_id}),
+            ("PowerStationMonitor/GetPowerStationPowerAndIncomeByDay",
+             {'powerstation_id': self.system_id, 'count': 1, 'date': date_s}),
+            ("PowerStationMonitor/GetPowerStationPacByDayForApp", {'id': self.system_id, 'date': date_s})
+        )
+
+    @staticmethod
+    def integrateDay(date, eday_kwh, pacs):
+        '''
+        integrateDay turns the power samples of GetPowerStationPacByDayForApp into entries with a cumulative energy
+        value, scaled so the integrated power matches the day yield reported by the API.
+        '''
+        entries = []
         minutes = 0
         eday_from_power = 0
-        for sample in data['pacs']:
+        for sample in pacs:
             parsed_date = datetime.strptime(sample['date'], "%m/%d/%Y %H:%M:%S")
             next_minutes = parsed_date.hour * 60 + parsed_date.minute
             sample['minutes'] = next_minutes - minutes
             minutes = next_minutes
             eday_from_power += sample['pac'] * sample['minutes']
-            factor = eday_kwh / eday_from_power if eday_from_power > 0 else 1
+        factor = eday_kwh / eday_from_power if eday_from_power > 0 else 1
 
-            eday_kwh = 0
-        for sample in data['pacs']:
+        eday_kwh = 0
+        for sample in pacs:
             date += timedelta(minutes=sample['minutes'])
             pgrid_w = sample['pac']
             increase = pgrid_w * sample['minutes'] * factor
             if increase > 0:
                 eday_kwh += increase
-                result['entries'].append({
+                entries.append({
                     'dt': date,
                     'pgrid_w': pgrid_w,
                     'eday_kwh': round(eday_kwh, 3)
                 })
 
-        return result
+        return entries
 
     def call(self, url, payload):
-        for i in range(1, 4):
+        if self.cache is not None:
+            return self.cache.lookup(url, payload, self.request)
+        return self.request(url, payload)
+
+    def request(self, url, payload):
+        '''
+        request does the actual api call for call, bypassing the response cache.
+        '''
+        started = self.retry.start()
+        for attempt in range(self.retry.attempts):
             try:
-                headers = {'User-Agent': 'PVMaster/2.0.4 (iPhone; iOS 11.4.1; Scale/2.00)', 'Token': self.token}
-
-                r = requests.post(self.base_url + url, headers=headers, data=payload, timeout=10)
-                r.raise_for_status()
-                data = r.json()
-                logging.debug(data)
-
-                if data['msg'] == 'success' and data['data'] is not None:
-                    return data['data']
-                else:
-                    loginPayload = {'account': self.account, 'pwd': self.password}
-                    r = requests.post(self.global_url + 'v1/Common/CrossLogin', headers=headers, data=loginPayload,
-                                          timeout=10)
-                    r.raise_for_status()
-                    data = r.json()
-                    self.base_url = data['api']
-                    self.token = json.dumps(data['data'])
+                if not self.tokens.isLoggedIn():
+                    self.login(self.token)
+
+                # wait for the limiter first, the token may be replaced while the request is queued
+                self.admit()
+                token = self.token
+                outcome, value = self.classify(url, self.post(self.base_url + url, payload, admitted=True))
+                if outcome == self.DONE:
+                    return value
+                elif outcome == self.LOGIN:
+                    self.login(token)
+                    continue
             except requests.exceptions.RequestException as exp:
-                logging.warning(exp)
-            time.sleep(i ** 3)
-        else:
-            logging.error("Failed to call GoodWe API")
+                if self.isFatal(exp):
+                    break
 
+            delay = self.nextDelay(url, attempt, started)
+            if delay is None:
+                break
+            self.retry.sleep(delay)
+
+        logging.error("Failed to call GoodWe API")
         return {}
 
+    def classify(self, url, data):
+        '''
+        classify sorts a decoded response for the request loop: (DONE, value) for a result (an empty dict when the
+        api returned data null), (LOGIN, None) when the token was rejected and (RETRY, None) for any other error. The
+        request loops of GoodWeApi and AsyncGoodWeApi only differ in how they wait for the login and the backoff.
+        '''
+        if self.isSuccess(data):
+            return self.DONE, data['data']
+        elif self.isEmpty(data):
+            self.hooks.onEmpty(self.endpointName(url))
+            return self.DONE, {}
+        elif self.tokens.isAuthFailure(data):
+            self.hooks.onAuthFailure(self.endpointName(url))
+            return self.LOGIN, None
+        logging.warning("{0} returned: {1}".format(url, data.get('msg')))
+        return self.RETRY, None
+
+    def isFatal(self, exp):
+        '''
+        isFatal logs a failed request and tells whether the call should be given up without retrying.
+        '''
+        logging.warning(exp)
+        if not self.retry.isRetryable(exp):
+            self.retry.fail()
+            return True
+        return False
+
+    def nextDelay(self, url, attempt, started):
+        '''
+        nextDelay returns the backoff before the next attempt, or None when the call should be given up.
+        '''
+        delay = self.retry.backoff(attempt, started)
+        if delay is not None:
+            self.hooks.onRetry(self.endpointName(url))
+        return delay
+
+    def admit(self):
+        '''
+        admit blocks until the limiter, when there is one, lets the next request of this client through.
+        '''
+        if self.limiter is not None:
+            self.limiter.acquire(self.priority, self.system_id)
+
+    def post(self, url, payload, logBody=True, admitted=False):
+        '''
+        post does a single POST to the given absolute url with the current token and returns the decoded json
+        response. It does not retry and does not login; use call for that. The request first waits for the limiter,
+        unless the caller already did (admitted), and only then takes the token.
+
+        With debug logging enabled the response body is logged as received, truncated to log_bytes and for one in
+        every log_sample responses. Nothing is formatted when debug logging is off.
+        '''
+        if not admitted:
+            self.admit()
+        headers = {'User-Agent': 'PVMaster/2.0.4 (iPhone; iOS 11.4.1; Scale/2.00)', 'Token': self.token}
+        endpoint = self.endpointName(url)
+
+        started = time.perf_counter()
+        takeConnectionTimings()
+        try:
+            r = self.session.post(url, headers=headers, data=payload, timeout=10)
+            r.raise_for_status()
+            data = self.decode(endpoint, r, logBody)
+        except (requests.exceptions.RequestException, ValueError) as exp:
+            self.hooks.onError(endpoint, exp)
+            raise
+
+        timings = takeConnectionTimings()
+        # r.elapsed includes setting up a new connection, which is reported in its own phases
+        timings['ttfb'] = max(0.0, r.elapsed.total_seconds() - timings['dns'] - timings['connect'] - timings['tls'])
+        timings['total'] = time.perf_counter() - started
+        self.hooks.onRequest(endpoint, r.status_code, timings, len(r.content))
+        return data
+
+    def decode(self, endpoint, r, logBody=True):
+        '''
+        decode returns the decoded json body of the response r, see post for the logging of the body. A body that is
+        not json raises requests.exceptions.JSONDecodeError, with or without fast_json.
+        '''
+        if self.fast_json and orjson is not None:
+            try:
+                data = orjson.loads(r.content)
+            except orjson.JSONDecodeError as exp:
+                # as r.json() does, so a body that is not json is a failed request on both paths
+                raise requests.exceptions.JSONDecodeError(exp.msg, exp.doc, exp.pos, response=r) from exp
+        else:
+            data = r.json()
+        if logBody and self.log_sample and logging.getLogger().isEnabledFor(logging.DEBUG) and \
+                next(self.logCounter) % self.log_sample == 0:
+            logging.debug("%s returned %d bytes: %s", endpoint, len(r.content), r.content[:self.log_bytes])
+        return data
+
+    @staticmethod
+    def endpointName(url):
+        return url.rstrip('/').rsplit('/', 1)[-1]
+
+    def login(self, staleToken=None):
+        '''
+        login replaces the token through the TokenManager. When staleToken is given and another client sharing the
+        token has already replaced it, no CrossLogin is done.
+        '''
+        self.tokens.refresh(self.token if staleToken is None else staleToken, self.crossLogin)
+
+    def crossLogin(self):
+        '''
+        crossLogin runs v1/Common/CrossLogin and returns the regional api url and the token. A response without
+        them raises requests.exceptions.RequestException.
+        '''
+        loginPayload = {'account': self.tokens.account, 'pwd': self.tokens.password}
+        self.hooks.onLogin()
+        data = self.post(self.global_url + 'v1/Common/CrossLogin', loginPayload, logBody=False)
+        if not isinstance(data, dict) or data.get('msg') != 'success' or not data.get('api') or not data.get('data'):
+            raise requests.exceptions.RequestException("CrossLogin failed: {0}".format(
+                data.get('msg') if isinstance(data, dict) else data))
+        return data['api'], json.dumps(data['data'])
+
+    @staticmethod
+    def isSuccess(data):
+        return data['msg'] == 'success' and data['data'] is not None
+
+    @staticmethod
+    def isEmpty(data):
+        return data['msg'] == 'success' and data['data'] is None
+
     def parseValue(self, value, unit):
         try:
             return float(value.rstrip(unit))
@@ -0,0 +1,157 @@
+import asyncio
+import functools
+import itertools
+import logging
+from collections import deque
+from datetime import timedelta
+
+import requests
+
+import gw_schema
+from gw_api import GoodWeApi
+
+''' asyncio counterpart of GoodWeApi '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+class AsyncGoodWeApi(GoodWeApi):
+    '''
+    AsyncGoodWeApi exposes the same methods as GoodWeApi, but every call is a coroutine. The getRawPs* methods are
+    inherited unchanged: they return the result of self.call, which here is a coroutine, so they are used as
+        soc = await api.getRawPsSoc()
+    The blocking HTTP work runs on a thread pool over the pooled session of GoodWeApi, at most max_concurrency
+    requests are in flight at the same time. All coroutines share the TokenManager of the instance, so coroutines that
+    hit the same expired token wait for a single login instead of running their own.
+
+    snapshot(), getDayReadings() and fetchDay() fan out independent calls concurrently, so they take about one round-trip of wall
+    time instead of one round-trip per endpoint.
+
+    iterReadings is an async generator with the same arguments as GoodWeApi.iterReadings, used as
+        async for entry in api.iterReadings(start, end):
+
+    With a ResponseCache, concurrent coroutines asking for the same cacheable response await one shared request.
+    '''
+
+    def __init__(self, system_id, account, password, max_concurrency=8, executor=None, **kwargs):
+        kwargs.setdefault('pool_maxsize', max(max_concurrency, 10))
+        super().__init__(system_id, account, password, **kwargs)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.executor = executor
+
+    async def run(self, fn, *args):
+        '''
+        run executes a blocking function on the executor while holding a slot of the concurrency semaphore.
+        '''
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def call(self, url, payload):
+        if self.cache is not None:
+            return await self.cache.alookup(url, payload, self.request)
+        return await self.request(url, payload)
+
+    async def request(self, url, payload):
+        started = self.retry.start()
+        for attempt in range(self.retry.attempts):
+            try:
+                if not self.tokens.isLoggedIn():
+                    await self.run(self.login, self.token)
+
+                await self.run(self.admit)
+                token = self.token
+                outcome, value = self.classify(url, await self.run(functools.partial(self.post, admitted=True),
+                                                                   self.base_url + url, payload))
+                if outcome == self.DONE:
+                    return value
+                elif outcome == self.LOGIN:
+                    await self.run(self.login, token)
+                    continue
+            except requests.exceptions.RequestException as exp:
+                if self.isFatal(exp):
+                    break
+
+            delay = self.nextDelay(url, attempt, started)
+            if delay is None:
+                break
+            await self.retry.asleep(delay)
+
+        logging.error("Failed to call GoodWe API")
+        return {}
+
+    async def getCurrentReadings(self, allInverters=False, typed=False):
+        data = await self.call("v1/PowerStation/GetMonitorDetailByPowerstationId", {'powerStationId': self.system_id})
+        if typed:
+            return (gw_schema.CURRENT_READINGS_ALL if allInverters else gw_schema.CURRENT_READINGS).extract(data)
+        return self.parseCurrentReadings(data, allInverters)
+
+    async def getPowerFlow(self):
+        return gw_schema.POWER_FLOW.extract(await self.getRawPsPowerFlow())
+
+    async def getRawPsInvertersBySn(self, inverters=None, parallelism=None):
+        return await self.batchBySn(self.getRawPsInverterBySn, inverters, parallelism)
+
+    async def getRawPsInverterKvsBySn(self, inverters=None, parallelism=None):
+        return await self.batchBySn(self.getRawPsInverterKvBySn, inverters, parallelism)
+
+    async def batchBySn(self, method, inverters, parallelism):
+        '''
+        batchBySn runs method for every inverter concurrently, bounded by the semaphore of the client. parallelism is
+        accepted for compatibility with GoodWeApi.
+        '''
+        if inverters is None:
+            inverters = await self.getRawPsInvertersByPowerStationId() or []
+        inverters = self.inverterList(inverters)
+        responses = await asyncio.gather(*[method(*inverter) for inverter in inverters])
+        return dict(zip([serial for serial, inverterType in inverters], responses))
+
+    async def getDayReadings(self, date, raw=False, columns=False, compact=False):
+        date_s = date.strftime('%Y-%m-%d')
+        detail, income, pacs = await asyncio.gather(*[self.call(url, payload)
+                                                      for url, payload in self.dayReadingsCalls(date_s)])
+        day = self.parseDay(date_s, income, pacs) if 'info' in detail else None
+        return self.dayResult(date, detail, day, raw, columns, compact)
+
+    async def fetchDay(self, date_s):
+        incomeCall, pacCall = self.dayReadingsCalls(date_s)[1:]
+        income, pacs = await asyncio.gather(self.call(*incomeCall), self.call(*pacCall))
+        return self.parseDay(date_s, income, pacs)
+
+    async def iterReadings(self, start, end, prefetch=2, location=False):
+        days = (start + timedelta(days=n) for n in range((end - start).days + 1))
+        detail = asyncio.ensure_future(self.getRawPsMonitorDetailByPowerstationId()) if location else None
+        pending = deque()
+        try:
+            for day in itertools.islice(days, prefetch + 1):
+                pending.append((day, asyncio.ensure_future(self.fetchDay(day.strftime('%Y-%m-%d')))))
+            if detail is not None:
+                yield self.locationOf(start, await detail)
+
+            while pending:
+                day, task = pending.popleft()
+                result = await task
+                if result is not None and result[1] is not None:
+                    for entry in self.integrateDay(day, result[0], result[1]):
+                        yield entry
+                result = task = None
+                for nextDay in itertools.islice(days, 1):
+                    pending.append((nextDay, asyncio.ensure_future(self.fetchDay(nextDay.strftime('%Y-%m-%d')))))
+        finally:
+            if detail is not None:
+                detail.cancel()
+            for day, task in pending:
+                task.cancel()
+
+    async def snapshot(self):
+        '''
+        snapshot fetches the station level endpoints that need nothing but the station id concurrently and returns
+        the raw responses keyed by method name.
+        '''
+        methods = ['getRawPsMonitorDetailByPowerstationId', 'getRawPsPowerFlow', 'getRawPsSoc',
+                   'getRawPsPowerstationById', 'getRawPsInvertersByPowerStationId', 'getRawPsKpiByPowerStationId',
+                   'getRawPsTime', 'getRawPsOnlyBps', 'getRawPsIsStoredInverter', 'getRawPsIsStoredPowerStation']
+        responses = await asyncio.gather(*[getattr(self, method)() for method in methods])
+        return dict(zip(methods, responses))
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date as dateType, datetime, timedelta
+
+from gw_api import GoodWeApi
+from gw_async import AsyncGoodWeApi
+from gw_history import HistoryStore
+from gw_token import TokenManager
+
+''' multi process backfill of the local GoodWe history '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+# state of a worker process, set up once by initWorker and reused for every chunk it runs
+worker = {}
+
+
+def initWorker(account, password, global_url, base_url, token, concurrency):
+    tokens = TokenManager(account, password, global_url=global_url)
+    tokens.base_url, tokens.token = base_url, token
+    worker.update(account=account, password=password, tokens=tokens, concurrency=concurrency,
+                  session=GoodWeApi.createSession(pool_maxsize=max(concurrency, 10)))
+
+
+async def fetchChunk(station, days):
+    api = AsyncGoodWeApi(station, worker['account'], worker['password'], max_concurrency=worker['concurrency'],
+                         session=worker['session'], tokens=worker['tokens'])
+    results = await asyncio.gather(*[api.getDayReadings(day, raw=True) for day in days])
+    return list(zip(days, results))
+
+
+def runChunk(station, days):
+    '''
+    runChunk fetches and integrates the days of one station in a worker process, the requests of the chunk run
+    concurrently up to the concurrency of the worker.
+    '''
+    return station, asyncio.run(fetchChunk(station, days))
+
+
+class BackfillEngine:
+    '''
+    BackfillEngine fills a HistoryStore for many stations over a date range. The (station, day) units that are not
+    yet stored complete are split in chunks of chunkDays days of one station and spread over a pool of processes;
+    every process runs the requests of its chunk concurrently with AsyncGoodWeApi and integrates the days itself, so
+    both the network waits and the integration are spread over the cores.
+
+    The parent process logs in once and hands the token to the workers, and it is the only writer of the store:
+    every finished chunk is written as it comes in. The store is the checkpoint, an interrupted backfill started
+    again only fetches the days that are still missing or incomplete.
+
+    concurrency caps the number of requests in flight over all processes together.
+    '''
+
+    def __init__(self, account, password, store, processes=None, concurrency=16, chunkDays=31,
+                 global_url=TokenManager.GLOBAL_URL, token_path=None):
+        self.account = account
+        self.password = password
+        self.store = store
+        self.processes = processes or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.chunkDays = chunkDays
+        self.tokens = TokenManager(account, password, global_url=global_url, path=token_path)
+
+    def chunks(self, stations, start, end):
+        '''
+        chunks returns the (station, days) work units of the range that are not stored complete.
+        '''
+        chunks = []
+        for station in stations:
+            stored = self.store.storedDays(station, start, end)
+            days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+            days = [day for day in days if self.store.dayKey(day) not in stored]
+            chunks.extend((station, days[n:n + self.chunkDays]) for n in range(0, len(days), self.chunkDays))
+        return chunks
+
+    def run(self, stations, start, end):
+        '''
+        run backfills every station from start to end (inclusive, datetime objects at midnight) and returns the
+        number of days fetched.
+        '''
+        chunks = self.chunks(stations, start, end)
+        total = sum(len(days) for station, days in chunks)
+        if not chunks:
+            logging.info("Backfill: nothing to fetch")
+            return 0
+
+        if not self.tokens.isLoggedIn():
+            GoodWeApi(None, self.account, self.password, tokens=self.tokens).login(self.tokens.token)
+
+        # every process has at least one request in flight, so never start more processes than concurrency
+        processes = min(self.processes, len(chunks), self.concurrency)
+        perProcess = max(1, self.concurrency // processes)
+        fetched = 0
+        with ProcessPoolExecutor(max_workers=processes, initializer=initWorker,
+                                 initargs=(self.account, self.password, self.tokens.global_url, self.tokens.base_url,
+                                           self.tokens.token, perProcess)) as executor:
+            futures = [executor.submit(runChunk, station, days) for station, days in chunks]
+            for future in as_completed(futures):
+                station, results = future.result()
+                for day, readings in results:
+                    self.store.putDay(station, day, readings)
+                fetched += len(results)
+                logging.info("Backfill: {0} of {1} days fetched".format(fetched, total))
+        return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the local GoodWe history database for many stations.")
+    parser.add_argument('start', help="first day, YYYY-MM-DD")
+    parser.add_argument('end', help="last day, YYYY-MM-DD (default today)", nargs='?')
+    parser.add_argument('--stations', nargs='+', help="station ids (default the converter-id of the config)")
+    parser.add_argument('--config', default='goodweConfig.json')
+    parser.add_argument('--db', default='goodweHistory.sqlite')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--concurrency', type=int, default=16, help="requests in flight over all processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.config) as configFile:
+        account = json.load(configFile)['account']
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.combine(dateType.today(),
+                                                                                      datetime.min.time())
+    with HistoryStore(args.db) as store:
+        engine = BackfillEngine(account['username'], account['password'], store, processes=args.processes,
+                                concurrency=args.concurrency)
+        engine.run(args.stations or [account['converter-id']], start, end)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+''' response cache for calls to the GoodWe API '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+# seconds a response stays valid, by the last part of the endpoint. Endpoints not listed are not cached.
+DEFAULT_TTLS = {
+    'GetMonitorDetailByPowerstationId': 30,
+    'GetPowerStationById': 3600,
+    'GetInvertersByPowerStationId': 3600,
+    'IsStoredInverter': 86400,
+    'IsStoredPowerStation': 86400,
+    'OnlyBps': 86400,
+}
+
+
+class ResponseCache:
+    '''
+    ResponseCache keeps api responses for the number of seconds given per endpoint in ttls, keyed by endpoint and
+    payload. At most maxsize responses are kept, the least recently used one is dropped first. Empty and failed
+    responses are not cached.
+
+    With coalesce set, a call for a key that is already being fetched by another thread waits for that fetch and
+    shares its response instead of doing the same http request again. alookup is the asyncio counterpart of lookup,
+    there concurrent coroutines of one event loop share a single fetch.
+
+    The cached objects are returned as is, callers must not modify them.
+    '''
+
+    def __init__(self, maxsize=1024, ttls=None, coalesce=True):
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.coalesce = coalesce
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.futures = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def ttl(self, url):
+        return self.ttls.get(url.rstrip('/').rsplit('/', 1)[-1])
+
+    @staticmethod
+    def key(url, payload):
+        return url.rstrip('/').rsplit('/', 1)[-1], tuple(sorted(payload.items()))
+
+    def get(self, key):
+        '''
+        get returns the cached response for key, or None when it is missing or expired.
+        '''
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, ttl, value):
+        if not value:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def probe(self, url, payload):
+        '''
+        probe returns (key, ttl, value) for url and payload: key is None when the endpoint is not cached, value is the
+        cached response or None on a miss.
+        '''
+        ttl = self.ttl(url)
+        if not ttl:
+            return None, None, None
+        key = self.key(url, payload)
+        return key, ttl, self.get(key)
+
+    def lookup(self, url, payload, fetch):
+        '''
+        lookup returns the cached response for url and payload, calling fetch(url, payload) on a miss.
+        '''
+        key, ttl, value = self.probe(url, payload)
+        if key is None:
+            return fetch(url, payload)
+        if value is not None:
+            return value
+        if not self.coalesce:
+            value = fetch(url, payload)
+            self.put(key, ttl, value)
+            return value
+
+        with self.lock:
+            event = self.inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self.inflight[key] = threading.Event()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            event.wait()
+            value = self.get(key)
+            return value if value is not None else fetch(url, payload)
+
+        try:
+            value = fetch(url, payload)
+            self.put(key, ttl, value)
+            return value
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            event.set()
+
+    async def alookup(self, url, payload, fetch):
+        '''
+        alookup is lookup for a coroutine function fetch(url, payload).
+        '''
+        key, ttl, value = self.probe(url, payload)
+        if key is None:
+            return await fetch(url, payload)
+        if value is not None:
+            return value
+        if not self.coalesce:
+            value = await fetch(url, payload)
+            self.put(key, ttl, value)
+            return value
+
+        # futures belong to one event loop, a cache shared between loops coalesces per loop
+        futureKey = (asyncio.get_running_loop(), key)
+        future = self.futures.get(futureKey)
+        if future is not None:
+            with self.lock:
+                self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = self.futures[futureKey] = asyncio.ensure_future(fetch(url, payload))
+        try:
+            value = await asyncio.shield(future)
+            self.put(key, ttl, value)
+            return value
+        finally:
+            del self.futures[futureKey]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced,
+                    'evictions': self.evictions, 'size': len(self.entries)}
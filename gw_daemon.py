@@ -0,0 +1,183 @@
+import argparse
+import importlib
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gw_api import GoodWeApi
+from gw_fleet import FleetPoller
+
+''' resident collector of GoodWe readings, configured by goodweConfig.json '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+class JsonLinesSink:
+    '''
+    JsonLinesSink writes every poll as one json line to a file, or to stdout when no path is given.
+    '''
+
+    def __init__(self, path=None):
+        self.file = open(path, 'a') if path is not None else sys.stdout
+
+    def write(self, station, results):
+        record = dict(results, station=station, time=time.time())
+        self.file.write(json.dumps(record, default=str) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+SINKS = {'jsonl': JsonLinesSink}
+
+
+def loadSink(spec):
+    '''
+    loadSink builds a sink from its config: {"type": "jsonl", ...} for the sinks in SINKS or
+    {"class": "module.Class", ...} for any class with write(station, results) and close(). The remaining keys are
+    passed to the constructor.
+    '''
+    spec = dict(spec)
+    if 'class' in spec:
+        module, name = spec.pop('class').rsplit('.', 1)
+        cls = getattr(importlib.import_module(module), name)
+    else:
+        cls = SINKS[spec.pop('type', 'jsonl')]
+    return cls(**spec)
+
+
+def stationIds(account):
+    '''
+    stationIds returns the converter-id of the account section as a list; it is a single id or a list of ids.
+    '''
+    stations = account['converter-id']
+    return [stations] if isinstance(stations, str) else list(stations)
+
+
+class Collector:
+    '''
+    Collector polls the stations of the account section of goodweConfig.json until it is stopped, writing every poll
+    to the sinks of the collector section:
+
+        "collector": {"interval": 60, "workers": 8, "token-file": "goodweToken.json",
+                      "methods": ["getCurrentReadings"], "sinks": [{"type": "jsonl", "path": "readings.jsonl"}]}
+
+    The process stays resident, so the session with its open connections and the token (also kept in token-file
+    across restarts) are reused by every poll; after the first cycle a poll costs one request.
+
+    reload() re-reads the config. The new stations, methods, workers and sinks take over at the next cycle: the cycle
+    in progress completes with the old ones, then the old sinks are closed. The client is only replaced when the
+    credentials changed.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.config = None
+        self.api = None
+        self.poller = None
+        self.sinks = []
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.reloadRequested = False
+        self.apply(self.read())
+
+    def read(self):
+        with open(self.path) as configFile:
+            return json.load(configFile)
+
+    def apply(self, config):
+        account = config['account']
+        settings = config.get('collector', {})
+        workers = settings.get('workers', 8)
+        oldApi, oldSinks = self.api, self.sinks
+
+        credentials = (account['username'], account['password'], settings.get('token-file'))
+        if self.config is None or credentials != self.credentials:
+            self.api = GoodWeApi(stationIds(account)[0], account['username'], account['password'],
+                                 pool_maxsize=max(workers, 10), token_path=settings.get('token-file'))
+            self.credentials = credentials
+
+        self.sinks = [loadSink(spec) for spec in settings.get('sinks', [{'type': 'jsonl'}])]
+        self.poller = FleetPoller(self.api, stationIds(account), methods=settings.get('methods',
+                                                                                     ['getCurrentReadings']),
+                                  interval=settings.get('interval', 60), workers=workers, callback=self.write)
+        self.config = config
+
+        for sink in oldSinks:
+            sink.close()
+        if oldApi is not None and oldApi is not self.api:
+            oldApi.close()
+        logging.info("Collecting {0} stations every {1}s".format(len(self.poller.stations), self.poller.interval))
+
+    def write(self, station, results):
+        for sink in self.sinks:
+            try:
+                sink.write(station, results)
+            except Exception as exp:
+                logging.warning("Sink {0} failed: {1!r}".format(type(sink).__name__, exp))
+
+    def reload(self):
+        '''
+        reload asks for the config to be read again before the next cycle, it is safe to call from a signal handler.
+        '''
+        self.reloadRequested = True
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopped = True
+        self.poller.stop()
+        self.wakeup.set()
+
+    def run(self):
+        started = time.time()
+        workers = self.poller.workers
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while not self.stopped:
+                if self.reloadRequested:
+                    self.reloadRequested = False
+                    try:
+                        self.apply(self.read())
+                    except Exception as exp:
+                        logging.error("Reload of {0} failed, keeping the running config: {1!r}".format(self.path,
+                                                                                                       exp))
+                if workers != self.poller.workers:
+                    # a cycle waits for all its polls, so the old executor is idle here
+                    executor.shutdown(wait=True)
+                    workers = self.poller.workers
+                    executor = ThreadPoolExecutor(max_workers=workers)
+                self.poller.runCycle(executor, started)
+                started = max(started + self.poller.interval, time.time())
+                self.wakeup.wait(max(0, started - time.time()))
+                self.wakeup.clear()
+        finally:
+            executor.shutdown(wait=True)
+
+        for sink in self.sinks:
+            sink.close()
+        self.api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect GoodWe readings until stopped, SIGHUP reloads the config.")
+    parser.add_argument('--config', default='goodweConfig.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    collector = Collector(args.config)
+    signal.signal(signal.SIGHUP, lambda signum, frame: collector.reload())
+    signal.signal(signal.SIGTERM, lambda signum, frame: collector.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: collector.stop())
+    collector.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import dataclasses
+import threading
+from collections import namedtuple
+
+''' change detection for polled readings '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+Delta = namedtuple('Delta', ['station', 'seq', 'changed', 'full'])
+
+
+def flatten(value, prefix=''):
+    '''
+    flatten turns nested dicts, lists and gw_schema records into one dict with dotted keys.
+    '''
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        value = {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (list, tuple)):
+        items = enumerate(value)
+    else:
+        return {prefix: value}
+
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, '{0}.{1}'.format(prefix, key) if prefix else str(key)))
+    return flat
+
+
+class DeltaTracker:
+    '''
+    DeltaTracker keeps the last emitted snapshot per station and reduces every new snapshot to the fields that
+    changed. Numeric fields only count as changed when they moved more than their deadband away from the value last
+    emitted, deadbands are given per field name (the last part of the dotted key, e.g. pgrid_w) or per dotted key.
+
+    update returns a Delta with a per station sequence number, or None when nothing changed so the downstream write
+    can be skipped. The first snapshot of a station, and every keyframe-th emitted delta when keyframe is set, is
+    emitted in full so a consumer can resynchronise.
+    '''
+
+    def __init__(self, deadbands=None, keyframe=0):
+        self.deadbands = dict(deadbands or {})
+        self.keyframe = keyframe
+        self.last = {}
+        self.seq = {}
+        self.skipped = 0
+        self.emitted = 0
+        self.lock = threading.Lock()
+
+    def deadband(self, key):
+        band = self.deadbands.get(key)
+        return band if band is not None else self.deadbands.get(key.rsplit('.', 1)[-1], 0)
+
+    def isChanged(self, key, old, new):
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)) and \
+                not isinstance(old, bool) and not isinstance(new, bool):
+            return abs(new - old) > self.deadband(key)
+        return old != new
+
+    def update(self, station, snapshot):
+        flat = flatten(snapshot)
+        with self.lock:
+            last = self.last.get(station)
+            seq = self.seq.get(station, 0) + 1
+            full = last is None or (self.keyframe and seq % self.keyframe == 0)
+            if full:
+                changed = flat
+            else:
+                changed = {key: value for key, value in flat.items()
+                           if key not in last or self.isChanged(key, last[key], value)}
+                changed.update({key: None for key in last if key not in flat})
+                if not changed:
+                    self.skipped += 1
+                    return None
+
+            if full:
+                self.last[station] = dict(flat)
+            else:
+                for key, value in changed.items():
+                    if key in flat:
+                        last[key] = value
+                    else:
+                        del last[key]
+            self.seq[station] = seq
+            self.emitted += 1
+            return Delta(station, seq, changed, bool(full))
+
+    def reset(self, station=None):
+        with self.lock:
+            if station is None:
+                self.last.clear()
+            else:
+                self.last.pop(station, None)
+
+    def wrap(self, callback):
+        '''
+        wrap returns a FleetPoller style callback(system_id, results) that calls callback(delta) only when something
+        changed.
+        '''
+        def onResults(station, results):
+            delta = self.update(station, results)
+            if delta is not None:
+                callback(delta)
+        return onResults
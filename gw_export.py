@@ -0,0 +1,326 @@
+import argparse
+import csv
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from gw_api import GoodWeApi
+from gw_delta import flatten
+
+''' bulk export of GoodWe data to CSV or Parquet files '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+PAC_COLUMNS = ['station', 'date', 'sample', 'pac']
+
+# types of the PAC_COLUMNS in a Parquet export
+PAC_SCHEMA = pa.schema([('station', pa.string()), ('date', pa.string()), ('sample', pa.string()),
+                        ('pac', pa.float64())]) if pa is not None else None
+
+# the getRawPsExport* methods of GoodWeApi, offered by the command line for raw exports
+RAW_METHODS = sorted(name for name in dir(GoodWeApi) if name.startswith('getRawPsExport'))
+
+
+def inferSchema(rows):
+    '''
+    inferSchema returns a pyarrow schema for rows of unknown shape, such as flattened raw responses: the columns in
+    order of appearance, whole numbers widened to float64 (a field that holds 12 for one station may hold 12.5 for
+    the next) and columns without a value as strings.
+    '''
+    fields = pa.Table.from_pylist(rows).schema
+    return pa.schema([(field.name, pa.float64() if pa.types.is_integer(field.type) else
+                       pa.string() if pa.types.is_null(field.type) else field.type) for field in fields])
+
+
+def inferColumns(rows):
+    '''
+    inferColumns returns the keys of rows in order of appearance.
+    '''
+    columns = {}
+    for row in rows:
+        columns.update((key, None) for key in row)
+    return list(columns)
+
+
+class CsvSink:
+    '''
+    CsvSink appends rows to one CSV file. Every commit flushes the file to disk, a restarted export appends to the
+    same file.
+
+    Without columns (raw exports) the columns are taken from the header of an existing file, or else from the keys
+    of the first rows written; fields that only show up in later rows are left out.
+    '''
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = columns
+        self.writer = None
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists and columns is None:
+            with open(path, newline='') as csvFile:
+                self.columns = next(csv.reader(csvFile))
+        self.file = open(path, 'a', newline='')
+        if self.columns is not None:
+            self.start(writeHeader=not exists)
+
+    def start(self, writeHeader):
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+        if writeHeader:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.writer is None:
+            self.columns = inferColumns(rows)
+            self.start(writeHeader=True)
+        self.writer.writerows(rows)
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    '''
+    ParquetSink writes rows to numbered part files in a directory, one row group per write. All row groups share one
+    pyarrow schema, so a day of whole numbers and a day with fractions end up in the same column type: the given
+    schema (PAC_SCHEMA for the power samples), or without one a schema inferred from the first rows written (see
+    inferSchema). Without a schema a restarted export takes the schema of the part files already written.
+
+    A part file is only complete once its footer is written, so a part is written under a hidden temporary name and
+    moved to its part-NNNNN.parquet name when commit closes it after rowsPerFile rows; only then are the rows
+    reported as committed. The directory therefore always reads as a dataset, a part left behind by an interrupted
+    export is removed when the export is started again.
+    '''
+
+    def __init__(self, path, schema=None, rowsPerFile=1000000):
+        if pa is None:
+            raise ImportError("Parquet export requires pyarrow")
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith('.part-') and name.endswith('.tmp'):
+                os.unlink(os.path.join(path, name))
+        self.path = path
+        self.schema = schema
+        self.rowsPerFile = rowsPerFile
+        self.writer = None
+        self.part = None
+        self.rows = 0
+        parts = self.parts()
+        if self.schema is None and parts:
+            self.schema = pq.read_schema(os.path.join(path, parts[-1]))
+
+    def parts(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith('part-') and name.endswith('.parquet'))
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.schema is None:
+            self.schema = inferSchema(rows)
+        table = pa.Table.from_pydict(dict((column, [row.get(column) for row in rows]) for column in self.schema.names),
+                                     schema=self.schema)
+        if self.writer is None:
+            self.part = 'part-{0:05d}.parquet'.format(len(self.parts()))
+            self.writer = pq.ParquetWriter(os.path.join(self.path, '.' + self.part + '.tmp'), self.schema)
+        self.writer.write_table(table)
+        self.rows += len(rows)
+
+    def commit(self, force=False):
+        if self.writer is None:
+            return True
+        if self.rows < self.rowsPerFile and not force:
+            return False
+        self.writer.close()
+        os.replace(os.path.join(self.path, '.' + self.part + '.tmp'), os.path.join(self.path, self.part))
+        self.writer = None
+        self.rows = 0
+        return True
+
+    def close(self):
+        self.commit(force=True)
+
+
+class Checkpoint:
+    '''
+    Checkpoint records finished export units in an append-only log of json lines, so recording a unit is one small
+    write whatever the size of the export. A unit is a key (a station and the export it belongs to) and a unit name,
+    for day exports the date. Units of a key are finished in order, so in memory only the last finished unit per key
+    is kept, together with the units that were skipped because the api returned no usable data; a unit is done when
+    it is not past the last finished unit of its key and was not skipped.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.last = {}
+        self.skipped = set()
+        if os.path.exists(path):
+            with open(path) as checkpointFile:
+                for line in checkpointFile:
+                    if line.strip():
+                        key, unit, done = json.loads(line)
+                        self.apply(tuple(key), unit, done)
+        self.file = open(path, 'a')
+
+    def apply(self, key, unit, done):
+        if done:
+            self.last[key] = max(self.last.get(key, unit), unit)
+            self.skipped.discard((key, unit))
+        else:
+            self.skipped.add((key, unit))
+
+    def isDone(self, key, unit):
+        return key in self.last and unit <= self.last[key] and (key, unit) not in self.skipped
+
+    def save(self, units):
+        '''
+        save records (key, unit, done) tuples, done False marks a unit that has to be exported again.
+        '''
+        if not units:
+            return
+        for key, unit, done in units:
+            self.apply(key, unit, done)
+            self.file.write(json.dumps([list(key), unit, done]) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class ExportJob:
+    '''
+    ExportJob streams GoodWe data of many stations over a date range into a sink, one response at a time, so the
+    memory used stays the same however many stations and days are exported.
+
+    export(start, end) writes the power samples of GetPowerStationPacByDayForApp per station and day.
+    exportRaw(method) writes the flattened response of a getRawPsExport* (or any other getRawPs*) method once per
+    station; these endpoints take no date.
+
+    A unit of work (a station and day, or a station and method) is recorded in the checkpoint once the sink has
+    committed it, an interrupted export started again with the same range and checkpoint skips those units. Days
+    the api returned no samples for, and today, are not recorded and are exported again on the next run, as are
+    units written after the last commit; a CSV export can therefore hold rows of such units more than once.
+    '''
+
+    def __init__(self, api, stations, sink, checkpoint):
+        self.api = api
+        self.stations = list(stations)
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.pending = []
+
+    def commit(self):
+        if self.sink.commit():
+            self.checkpoint.save(self.pending)
+            self.pending = []
+
+    def finish(self):
+        self.sink.close()
+        self.checkpoint.save(self.pending)
+        self.pending = []
+
+    def units(self, start, end):
+        '''
+        units yields the (key, station, day) units of the range that are not done yet.
+        '''
+        span = (start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        day = start
+        while day <= end:
+            for station in self.stations:
+                key = (station,) + span
+                if not self.checkpoint.isDone(key, day.strftime('%Y-%m-%d')):
+                    yield key, station, day
+            day += timedelta(days=1)
+
+    def export(self, start, end, today=None):
+        today_s = (today if today is not None else datetime.now()).strftime('%Y-%m-%d')
+        exported = skipped = 0
+        for key, station, day in self.units(start, end):
+            date_s = day.strftime('%Y-%m-%d')
+            result = self.api.forStation(station).fetchDay(date_s)
+            pacs = result[1] if result is not None else None
+            if pacs:
+                self.sink.write([{'station': station, 'date': date_s, 'sample': sample['date'], 'pac': sample['pac']}
+                                 for sample in pacs])
+            if pacs and date_s < today_s:
+                self.pending.append((key, date_s, True))
+                self.commit()
+                exported += 1
+            else:
+                self.checkpoint.save([(key, date_s, False)])
+                skipped += 1
+
+        self.finish()
+        logging.info("Exported {0} station days, {1} left for a next run".format(exported, skipped))
+        return exported
+
+    def exportRaw(self, method):
+        exported = 0
+        for station in self.stations:
+            key = (station, method)
+            if self.checkpoint.isDone(key, ''):
+                continue
+            response = getattr(self.api.forStation(station), method)()
+            if not response:
+                continue
+            rows = response if isinstance(response, list) else [response]
+            self.sink.write([dict(flatten(row), station=station) for row in rows if row])
+            self.pending.append((key, '', True))
+            self.commit()
+            exported += 1
+
+        self.finish()
+        return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the power samples, or the response of an export method, of "
+                                                 "GoodWe stations.")
+    parser.add_argument('start', help="first day, YYYY-MM-DD (power samples only)", nargs='?')
+    parser.add_argument('end', help="last day, YYYY-MM-DD (power samples only)", nargs='?')
+    parser.add_argument('output', help="CSV file or Parquet directory")
+    parser.add_argument('--raw', choices=RAW_METHODS,
+                        help="export the flattened response of this method once per station instead of the samples")
+    parser.add_argument('--stations', nargs='+', help="station ids (default the converter-id of the config)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--config', default='goodweConfig.json')
+    args = parser.parse_args()
+    if args.raw is None and (args.start is None or args.end is None):
+        parser.error("start and end are required for an export of the power samples")
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.config) as configFile:
+        account = json.load(configFile)['account']
+
+    stations = args.stations or [account['converter-id']]
+    if args.format == 'csv':
+        sink = CsvSink(args.output, None if args.raw else PAC_COLUMNS)
+    else:
+        sink = ParquetSink(args.output, None if args.raw else PAC_SCHEMA)
+    with GoodWeApi(stations[0], account['username'], account['password']) as api:
+        job = ExportJob(api, stations, sink, Checkpoint(args.output.rstrip('/') + '.checkpoint'))
+        if args.raw:
+            job.exportRaw(args.raw)
+        else:
+            job.export(datetime.strptime(args.start, '%Y-%m-%d'), datetime.strptime(args.end, '%Y-%m-%d'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+''' local stand-in for the SEMS api, for tests and benchmarks '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+MAINTENANCE_PAGE = b'<html><body><h1>SEMS is under maintenance</h1></body></html>'
+
+
+class FakeSemsServer:
+    '''
+    FakeSemsServer answers the SEMS endpoints used by GoodWeApi with generated data, so the client can be tested and
+    benchmarked without the real cloud. Point a client at it with
+        api.global_url = api.base_url = server.url
+    CrossLogin hands out tokens that expire after tokenTtl seconds, a request with an unknown or expired token gets
+    the SEMS "authorization has expired" answer (code 100002).
+
+    Every request waits latency seconds (plus up to jitter seconds). errorRate is the fraction of requests answered
+    with http 500 and nullRate the fraction of successful requests answered with data null. With maintenance set
+    every api call is answered with http 200 and an html page instead of json, as SEMS does during maintenance.
+    inverters sets the number of inverters per station.
+
+    The counters (logins, calls, errors, nulls, expired and calls per endpoint) are returned by stats().
+    '''
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, errorRate=0.0, nullRate=0.0,
+                 tokenTtl=3600, inverters=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.nullRate = nullRate
+        self.tokenTtl = tokenTtl
+        self.inverters = inverters
+        self.maintenance = False
+        self.tokens = {}
+        self.counters = Counter()
+        self.endpoints = Counter()
+        self.lock = threading.Lock()
+
+        handler = type('FakeSemsHandler', (FakeSemsHandler,), {'fake': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = 'http://{0}:{1}/api/'.format(host, self.httpd.server_port)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['endpoints'] = dict(self.endpoints)
+        return stats
+
+    def expireTokens(self):
+        with self.lock:
+            self.tokens.clear()
+
+    def login(self, form):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.time() + self.tokenTtl
+            self.counters['logins'] += 1
+        return {'hasError': False, 'code': 0, 'msg': 'success', 'api': self.url,
+                'data': {'uid': 'fake', 'timestamp': int(time.time() * 1000), 'token': token, 'client': 'ios',
+                         'version': 'v2.0.4', 'language': 'en'}}
+
+    def isValid(self, tokenHeader):
+        try:
+            token = json.loads(tokenHeader).get('token')
+        except (TypeError, ValueError, AttributeError):
+            return False
+        with self.lock:
+            expires = self.tokens.get(token)
+        return expires is not None and expires > time.time()
+
+    def respond(self, endpoint, tokenHeader, form):
+        '''
+        respond returns the http status and the json body for a request.
+        '''
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        if endpoint == 'Common/CrossLogin':
+            return 200, self.login(form)
+
+        with self.lock:
+            self.counters['calls'] += 1
+            self.endpoints[endpoint] += 1
+
+        if self.maintenance:
+            return 200, MAINTENANCE_PAGE
+        if random.random() < self.errorRate:
+            self.count('errors')
+            return 500, {'hasError': True, 'code': 500, 'msg': 'internal error', 'data': None}
+        if not self.isValid(tokenHeader):
+            self.count('expired')
+            return 200, {'hasError': True, 'code': 100002,
+                         'msg': 'The authorization has expired, please log in again.', 'data': None}
+        if random.random() < self.nullRate:
+            self.count('nulls')
+            return 200, {'hasError': False, 'code': 0, 'msg': 'success', 'data': None}
+
+        station = form.get('powerStationId') or form.get('powerstation_id') or form.get('id') or 'fake'
+        generator = getattr(self, 'data' + endpoint.rsplit('/', 1)[-1], self.dataDefault)
+        return 200, {'hasError': False, 'code': 0, 'msg': 'success', 'data': generator(station, form)}
+
+    def power(self, minute):
+        if not 360 <= minute <= 1200:
+            return 0
+        return round(4000 * math.sin(math.pi * (minute - 360) / 840))
+
+    def inverterList(self, station):
+        minute = datetime.now().hour * 60 + datetime.now().minute
+        pac = self.power(minute)
+        return [{'sn': '{0}-INV{1:02d}'.format(station, n), 'type': 'GW5000D-NS', 'status': 1 if pac else -1,
+                 'out_pac': pac, 'eday': round(pac * minute / 60000.0, 1), 'etotal': 12345.6 + n,
+                 'output_voltage': '{0:.1f}V'.format(230 + random.uniform(-3, 3))} for n in range(self.inverters)]
+
+    def dataGetMonitorDetailByPowerstationId(self, station, form):
+        return {'info': {'powerstation_id': station, 'stationname': 'Fake ' + station, 'latitude': 52.37,
+                         'longitude': 4.89, 'capacity': 5.0},
+                'kpi': {'power': 12.3, 'total_power': 12345.6},
+                'inverter': self.inverterList(station)}
+
+    def dataGetInvertersByPowerStationId(self, station, form):
+        return [{'sn': inverter['sn'], 'type': inverter['type'], 'name': inverter['sn']}
+                for inverter in self.inverterList(station)]
+
+    def dataGetInverterBySn(self, station, form):
+        return {'sn': form.get('inverterSn'), 'type': form.get('type'), 'out_pac': 1234.0, 'eday': 12.3}
+
+    def dataGetPowerFlow(self, station, form):
+        pac = self.power(datetime.now().hour * 60 + datetime.now().minute)
+        return {'pv': '{0}(W)'.format(pac), 'load': '800(W)', 'grid': '{0}(W)'.format(pac - 800), 'soc': 0}
+
+    def dataGetPowerStationPowerAndIncomeByDay(self, station, form):
+        return [{'d': form.get('date'), 'p': 25.0, 'm': 5.0}]
+
+    def dataGetPowerStationPacByDayForApp(self, station, form):
+        day = datetime.strptime(form.get('date', '2019-01-01'), '%Y-%m-%d')
+        return {'pacs': [{'date': (day + timedelta(minutes=minute)).strftime('%m/%d/%Y %H:%M:%S'),
+                          'pac': self.power(minute)} for minute in range(0, 24 * 60, 5)]}
+
+    def dataDefault(self, station, form):
+        return {'powerStationId': station}
+
+
+class FakeSemsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    fake = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        form = dict(parse_qsl(body.decode()))
+        # GoodWeApi mixes "v1/..", "/v1/.." and "/api/v1/.." endpoints, so normalise on what follows v1/
+        path = self.path.split('?', 1)[0]
+        endpoint = path.split('v1/', 1)[-1].strip('/') if 'v1/' in path else path.rsplit('api/', 1)[-1].strip('/')
+
+        status, data = self.fake.respond(endpoint, self.headers.get('Token'), form)
+        html = isinstance(data, bytes)
+        response = data if html else json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html' if html else 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the SEMS api.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--null-rate', type=float, default=0.0)
+    parser.add_argument('--token-ttl', type=float, default=3600)
+    args = parser.parse_args()
+
+    server = FakeSemsServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.null_rate,
+                            args.token_ttl)
+    print("Fake SEMS api on " + server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from gw_api import GoodWeApi
+
+''' polling of many power stations of one account '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+CycleReport = namedtuple('CycleReport', ['cycle', 'started', 'duration', 'polled', 'failed', 'behind'])
+
+
+def isEmpty(result):
+    '''
+    isEmpty tells whether a poll result holds no data: None, an empty list, or a dict of which every value is empty.
+    A failed call returns {}, and getCurrentReadings turns that into a dict of None readings.
+    '''
+    if isinstance(result, dict):
+        return all(isEmpty(value) for value in result.values())
+    if isinstance(result, (list, tuple)):
+        return not result
+    return result is None
+
+
+class FleetPoller:
+    '''
+    FleetPoller polls a list of power stations of one account on a fixed interval. All stations share one session
+    and one token (see GoodWeApi.forStation), the polls run on a thread pool of the given number of workers.
+
+    Within a cycle the polls are staggered: station n of N is started interval * n / N seconds after the start of the
+    cycle, which spreads the load on the API evenly over the interval instead of bursting it at the top of the minute.
+    A station falls behind when its poll only completes after its next scheduled poll time.
+
+    A poll fails when a method raises or returns no data (see isEmpty), the api client gives up on a call by
+    returning an empty result. For every successful poll callback(system_id, results) is called with the results
+    keyed by method name, after every cycle onCycle(report) is called with a CycleReport.
+    '''
+
+    def __init__(self, api, station_ids, methods=('getCurrentReadings',), interval=60, workers=8, callback=None,
+                 onCycle=None):
+        self.stations = [api.forStation(station_id) for station_id in station_ids]
+        self.methods = list(methods)
+        self.interval = interval
+        self.workers = workers
+        self.callback = callback
+        self.onCycle = onCycle
+        self.cycle = 0
+        self.stopEvent = threading.Event()
+
+    @classmethod
+    def create(cls, account, password, station_ids, workers=8, **kwargs):
+        '''
+        create builds the shared client for the account with a connection pool sized to the number of workers.
+        '''
+        api = GoodWeApi(station_ids[0], account, password, pool_maxsize=workers)
+        return cls(api, station_ids, workers=workers, **kwargs)
+
+    def poll(self, station):
+        results = {}
+        for method in self.methods:
+            results[method] = getattr(station, method)()
+        return results
+
+    def pollStation(self, station, due):
+        '''
+        pollStation runs the configured methods for one station and returns (succeeded, finished in time).
+        '''
+        try:
+            results = self.poll(station)
+        except Exception as exp:
+            logging.warning("Poll of station {0} failed: {1!r}".format(station.system_id, exp))
+            return False, time.time() <= due + self.interval
+
+        empty = [method for method, result in results.items() if isEmpty(result)]
+        if empty:
+            logging.warning("Poll of station {0} failed: no data from {1}".format(station.system_id,
+                                                                                  ', '.join(empty)))
+            return False, time.time() <= due + self.interval
+
+        if self.callback is not None:
+            self.callback(station.system_id, results)
+        return True, time.time() <= due + self.interval
+
+    def runCycle(self, executor, started):
+        futures = []
+        for n, station in enumerate(self.stations):
+            due = started + self.interval * n / len(self.stations)
+            if self.stopEvent.wait(max(0, due - time.time())):
+                break
+            futures.append(executor.submit(self.pollStation, station, due))
+
+        wait(futures)
+        outcomes = [future.result() for future in futures]
+
+        self.cycle += 1
+        report = CycleReport(cycle=self.cycle,
+                             started=started,
+                             duration=time.time() - started,
+                             polled=len(outcomes),
+                             failed=sum(1 for succeeded, inTime in outcomes if not succeeded),
+                             behind=sum(1 for succeeded, inTime in outcomes if not inTime))
+
+        message = "Cycle {cycle}: {polled} stations in {duration:.1f}s, {failed} failed, {behind} behind".format(
+            **report._asdict())
+        if report.behind:
+            logging.warning(message)
+        else:
+            logging.info(message)
+        if self.onCycle is not None:
+            self.onCycle(report)
+        return report
+
+    def run(self, cycles=None):
+        '''
+        run polls until stop() is called or, when given, the number of cycles has completed. A cycle that overruns
+        the interval is followed directly by the next one.
+        '''
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            completed = 0
+            while not self.stopEvent.is_set() and (cycles is None or completed < cycles):
+                self.runCycle(executor, started)
+                completed += 1
+                started = max(started + self.interval, time.time())
+                if cycles is None or completed < cycles:
+                    self.stopEvent.wait(max(0, started - time.time()))
+
+    def stop(self):
+        self.stopEvent.set()
@@ -0,0 +1,195 @@
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date as dateType, datetime, timedelta
+
+from gw_api import GoodWeApi
+
+''' local history of GoodWe day readings '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS days (
+    station TEXT NOT NULL,
+    date TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    eday_kwh REAL,
+    complete INTEGER NOT NULL,
+    fetched TEXT NOT NULL,
+    PRIMARY KEY (station, date)
+);
+CREATE TABLE IF NOT EXISTS pacs (
+    station TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sample TEXT NOT NULL,
+    pac REAL NOT NULL,
+    PRIMARY KEY (station, date, sample)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    station TEXT NOT NULL,
+    date TEXT NOT NULL,
+    dt TEXT NOT NULL,
+    pgrid_w REAL NOT NULL,
+    eday_kwh REAL NOT NULL,
+    PRIMARY KEY (station, date, dt)
+);
+'''
+
+
+class HistoryStore:
+    '''
+    HistoryStore keeps getDayReadings results in a SQLite database, keyed by station and date. For every day the
+    station position and day yield (days), the raw power samples of GetPowerStationPacByDayForApp (pacs) and the
+    integrated readings (entries) are stored. With a RollupStore (see gw_rollup) the power samples of every stored
+    day are also folded into its aggregates.
+
+    A day is complete when it lies before today and the api returned both a day yield and power samples. backfill
+    only fetches days that are missing or incomplete, today is always fetched again, everything else is served from
+    the database.
+    '''
+
+    def __init__(self, path, rollups=None):
+        self.path = path
+        self.rollups = rollups
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def dayKey(day):
+        return day.strftime('%Y-%m-%d')
+
+    def isComplete(self, station, day):
+        with self.lock:
+            row = self.connection.execute('SELECT complete FROM days WHERE station = ? AND date = ?',
+                                          (station, self.dayKey(day))).fetchone()
+        return row is not None and bool(row[0])
+
+    def storedDays(self, station, start, end):
+        '''
+        storedDays returns the set of YYYY-MM-DD dates between start and end (inclusive) that are stored complete.
+        '''
+        with self.lock:
+            rows = self.connection.execute('SELECT date FROM days WHERE station = ? AND date BETWEEN ? AND ? AND '
+                                           'complete = 1', (station, self.dayKey(start), self.dayKey(end)))
+            return set(row[0] for row in rows)
+
+    def putDay(self, station, day, readings, today=None):
+        '''
+        putDay stores a getDayReadings result fetched with raw=True, replacing what was stored for that day.
+        '''
+        today = today if today is not None else dateType.today()
+        date_s = self.dayKey(day)
+        pacs = readings.get('pacs', [])
+        complete = self.dayKey(day) < self.dayKey(today) and 'eday_kwh' in readings and len(pacs) > 0
+
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM pacs WHERE station = ? AND date = ?', (station, date_s))
+            self.connection.execute('DELETE FROM entries WHERE station = ? AND date = ?', (station, date_s))
+            self.connection.execute('INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (station, date_s, readings.get('latitude'), readings.get('longitude'),
+                                     readings.get('eday_kwh'), int(complete), datetime.now().isoformat()))
+            self.connection.executemany('INSERT OR REPLACE INTO pacs VALUES (?, ?, ?, ?)',
+                                        [(station, date_s, sample['date'], sample['pac']) for sample in pacs])
+            self.connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                                        [(station, date_s, entry['dt'].isoformat(), entry['pgrid_w'],
+                                          entry['eday_kwh']) for entry in readings.get('entries', [])])
+        if self.rollups is not None:
+            self.rollups.add(station, pacs)
+        return complete
+
+    def getDay(self, station, day):
+        '''
+        getDay returns the stored day in the format of getDayReadings, or None when the day is not stored.
+        '''
+        date_s = self.dayKey(day)
+        with self.lock:
+            row = self.connection.execute('SELECT latitude, longitude FROM days WHERE station = ? AND date = ?',
+                                          (station, date_s)).fetchone()
+            if row is None:
+                return None
+            entries = self.connection.execute('SELECT dt, pgrid_w, eday_kwh FROM entries WHERE station = ? AND '
+                                              'date = ? ORDER BY dt', (station, date_s)).fetchall()
+
+        return {
+            'latitude': row[0],
+            'longitude': row[1],
+            'entries': [{'dt': datetime.fromisoformat(dt), 'pgrid_w': pgrid_w, 'eday_kwh': eday_kwh}
+                        for dt, pgrid_w, eday_kwh in entries]
+        }
+
+    def getPacs(self, station, day):
+        with self.lock:
+            rows = self.connection.execute('SELECT sample, pac FROM pacs WHERE station = ? AND date = ? ORDER BY '
+                                           'rowid', (station, self.dayKey(day))).fetchall()
+        return [{'date': sample, 'pac': pac} for sample, pac in rows]
+
+    def backfill(self, api, start, end):
+        '''
+        backfill makes sure every day from start to end (inclusive, datetime objects at midnight) is stored for the
+        station of api, fetching only missing and incomplete days. Returns the number of days fetched and the number
+        of days served from the database.
+        '''
+        stored = self.storedDays(api.system_id, start, end)
+        fetched = 0
+        day = start
+        while day <= end:
+            if self.dayKey(day) not in stored:
+                self.putDay(api.system_id, day, api.getDayReadings(day, raw=True))
+                fetched += 1
+            day += timedelta(days=1)
+
+        total = (end - start).days + 1
+        logging.info("Backfill of {0}: {1} days fetched, {2} from disk".format(api.system_id, fetched,
+                                                                              total - fetched))
+        return fetched, total - fetched
+
+    def dayReadings(self, api, start, end):
+        '''
+        dayReadings backfills the range and then yields (date, readings) for every day from the database.
+        '''
+        self.backfill(api, start, end)
+        day = start
+        while day <= end:
+            yield day, self.getDay(api.system_id, day)
+            day += timedelta(days=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the local GoodWe history database.")
+    parser.add_argument('start', help="first day, YYYY-MM-DD")
+    parser.add_argument('end', help="last day, YYYY-MM-DD (default today)", nargs='?')
+    parser.add_argument('--config', default='goodweConfig.json')
+    parser.add_argument('--db', default='goodweHistory.sqlite')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.config) as configFile:
+        account = json.load(configFile)['account']
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.combine(dateType.today(),
+                                                                                      datetime.min.time())
+    with GoodWeApi(account['converter-id'], account['username'], account['password']) as api, \
+            HistoryStore(args.db) as store:
+        store.backfill(api, start, end)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import socket
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+''' instrumentation of the calls to the GoodWe API '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+class CallHooks:
+    '''
+    CallHooks is the interface GoodWeApi reports its calls to (see the hooks argument of GoodWeApi). All methods do
+    nothing, subclasses override the ones they need. endpoint is the last part of the api url, for example
+    GetMonitorDetailByPowerstationId.
+
+    onRequest is called for every http request that got a response, timings holds the seconds spent in dns, connect,
+    tls (only for new connections, 0 when a pooled connection was reused), ttfb (from sending the request until the
+    response headers, without the dns, connect and tls time) and total (all of it, including reading and decoding
+    the body).
+    '''
+
+    def onRequest(self, endpoint, status, timings, nbytes):
+        pass
+
+    def onError(self, endpoint, exp):
+        pass
+
+    def onRetry(self, endpoint):
+        pass
+
+    def onAuthFailure(self, endpoint):
+        pass
+
+    def onEmpty(self, endpoint):
+        pass
+
+    def onLogin(self):
+        pass
+
+
+# timings of the connection set up by the current thread, read back by GoodWeApi.post
+connectionTimings = threading.local()
+
+
+def takeConnectionTimings():
+    '''
+    takeConnectionTimings returns the dns, connect and tls seconds recorded for the current thread since the last
+    call and resets them.
+    '''
+    timings = {'dns': getattr(connectionTimings, 'dns', 0.0), 'connect': getattr(connectionTimings, 'connect', 0.0),
+               'tls': getattr(connectionTimings, 'tls', 0.0)}
+    connectionTimings.dns = connectionTimings.connect = connectionTimings.tls = 0.0
+    return timings
+
+
+class TimedHTTPConnection(HTTPConnection):
+
+    def _new_conn(self):
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            # resolve here so the dns lookup can be timed apart from the tcp connect
+            addresses = list(dict.fromkeys(info[4][0] for info in
+                                           socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)))
+        except socket.gaierror:
+            addresses = [host]
+        resolved = time.perf_counter()
+        connectionTimings.dns = resolved - started
+
+        try:
+            # try the addresses in turn as create_connection would, the hostname is restored afterwards so the
+            # next connect of this connection object resolves again
+            for n, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if n == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+        connectionTimings.connect = time.perf_counter() - resolved
+        return sock
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - started
+        connectionTimings.tls = max(0.0, elapsed - getattr(connectionTimings, 'dns', 0.0) -
+                                    getattr(connectionTimings, 'connect', 0.0))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    '''
+    TimedHTTPAdapter is an HTTPAdapter whose connections record how long dns, connect and tls took.
+    '''
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+
+class Histogram:
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for n, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                self.counts[n] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics(CallHooks):
+    '''
+    Metrics collects per endpoint latency histograms (dns, connect, tls, ttfb and total), request, error, retry,
+    auth failure and empty response counts, response bytes and the number of logins. Use install to attach it to a
+    client, prometheus returns everything in the Prometheus text format and serve exposes that on /metrics.
+    '''
+
+    PHASES = ('dns', 'connect', 'tls', 'ttfb', 'total')
+
+    def __init__(self):
+        self.histograms = defaultdict(Histogram)
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.retries = defaultdict(int)
+        self.authFailures = defaultdict(int)
+        self.empty = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.logins = 0
+        self.lock = threading.Lock()
+
+    def install(self, api):
+        '''
+        install makes api (and clients later made from it with forStation) report to this Metrics, and mounts a
+        TimedHTTPAdapter with the pool settings of the current adapter so connection set up is timed as well.
+        '''
+        current = api.session.get_adapter(api.global_url)
+        adapter = TimedHTTPAdapter(pool_connections=getattr(current, '_pool_connections', 4),
+                                   pool_maxsize=getattr(current, '_pool_maxsize', 10),
+                                   pool_block=getattr(current, '_pool_block', False))
+        api.session.mount('https://', adapter)
+        api.session.mount('http://', adapter)
+        api.hooks = self
+        return self
+
+    def onRequest(self, endpoint, status, timings, nbytes):
+        with self.lock:
+            self.requests[(endpoint, status)] += 1
+            self.bytes[endpoint] += nbytes
+            for phase in self.PHASES:
+                if phase in ('dns', 'connect', 'tls') and not timings.get(phase):
+                    continue
+                self.histograms[(endpoint, phase)].observe(timings.get(phase, 0.0))
+
+    def onError(self, endpoint, exp):
+        with self.lock:
+            self.errors[(endpoint, type(exp).__name__)] += 1
+
+    def onRetry(self, endpoint):
+        with self.lock:
+            self.retries[endpoint] += 1
+
+    def onAuthFailure(self, endpoint):
+        with self.lock:
+            self.authFailures[endpoint] += 1
+
+    def onEmpty(self, endpoint):
+        with self.lock:
+            self.empty[endpoint] += 1
+
+    def onLogin(self):
+        with self.lock:
+            self.logins += 1
+
+    @staticmethod
+    def labels(**labels):
+        return '{' + ','.join('{0}="{1}"'.format(key, str(value).replace('"', '\\"'))
+                              for key, value in labels.items()) + '}'
+
+    def prometheus(self):
+        lines = []
+
+        def counter(name, help, values, labelNames):
+            lines.append('# HELP {0} {1}'.format(name, help))
+            lines.append('# TYPE {0} counter'.format(name))
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append('{0}{1} {2}'.format(name, self.labels(**dict(zip(labelNames, key))), value))
+
+        with self.lock:
+            lines.append('# HELP goodwe_request_seconds Time spent per phase of a GoodWe api request.')
+            lines.append('# TYPE goodwe_request_seconds histogram')
+            for (endpoint, phase), histogram in sorted(self.histograms.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append('goodwe_request_seconds_bucket{0} {1}'.format(
+                        self.labels(endpoint=endpoint, phase=phase, le=bound), count))
+                lines.append('goodwe_request_seconds_bucket{0} {1}'.format(
+                    self.labels(endpoint=endpoint, phase=phase, le='+Inf'), histogram.count))
+                lines.append('goodwe_request_seconds_sum{0} {1}'.format(
+                    self.labels(endpoint=endpoint, phase=phase), histogram.sum))
+                lines.append('goodwe_request_seconds_count{0} {1}'.format(
+                    self.labels(endpoint=endpoint, phase=phase), histogram.count))
+
+            counter('goodwe_requests_total', 'Requests by endpoint and http status.', self.requests,
+                    ('endpoint', 'status'))
+            counter('goodwe_errors_total', 'Requests that failed without a response.', self.errors,
+                    ('endpoint', 'error'))
+            counter('goodwe_retries_total', 'Retries by endpoint.', self.retries, ('endpoint',))
+            counter('goodwe_auth_failures_total', 'Responses that rejected the token.', self.authFailures,
+                    ('endpoint',))
+            counter('goodwe_empty_responses_total', 'Successful responses with data null.', self.empty,
+                    ('endpoint',))
+            counter('goodwe_response_bytes_total', 'Response body bytes by endpoint.', self.bytes, ('endpoint',))
+            lines.append('# HELP goodwe_logins_total CrossLogin requests.')
+            lines.append('# TYPE goodwe_logins_total counter')
+            lines.append('goodwe_logins_total {0}'.format(self.logins))
+
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9108, host=''):
+        '''
+        serve exposes prometheus() on http://host:port/metrics from a background thread and returns the server.
+        '''
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+''' client side rate limiting of GoodWe API requests '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+LIVE = 'live'
+INTERACTIVE = 'interactive'
+BACKFILL = 'backfill'
+PRIORITIES = (LIVE, INTERACTIVE, BACKFILL)
+
+
+class TokenBucket:
+    '''
+    TokenBucket allows rate requests per second on average with bursts of up to burst requests. It is not thread
+    safe on its own, RequestScheduler guards it with its lock.
+    '''
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait(self):
+        '''
+        wait returns the number of seconds until the next token is available.
+        '''
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RequestScheduler:
+    '''
+    RequestScheduler admits the requests of all clients of an account through one token bucket. Waiting requests
+    are admitted by priority (live before interactive before backfill) and, within a priority, round robin over the
+    stations, so one station with a long backfill cannot starve the others. Backfills therefore only use the capacity
+    that live polls leave over.
+
+    Clients use it through the limiter argument of GoodWeApi, the priority of a client is set with
+    GoodWeApi.withPriority. depth() reports the number of waiting requests per priority, stats() also the admitted
+    requests and the average wait per priority.
+    '''
+
+    def __init__(self, rate=1.0, burst=5):
+        self.bucket = TokenBucket(rate, burst)
+        self.queues = dict((priority, OrderedDict()) for priority in PRIORITIES)
+        self.admitted = dict((priority, 0) for priority in PRIORITIES)
+        self.waited = dict((priority, 0.0) for priority in PRIORITIES)
+        self.condition = threading.Condition()
+
+    def head(self):
+        for priority in PRIORITIES:
+            stations = self.queues[priority]
+            if stations:
+                station, waiters = next(iter(stations.items()))
+                return priority, station, waiters[0]
+        return None
+
+    def acquire(self, priority=LIVE, station=None):
+        '''
+        acquire blocks until the request may be sent.
+        '''
+        ticket = object()
+        started = time.monotonic()
+        with self.condition:
+            self.queues[priority].setdefault(station, deque()).append(ticket)
+            while True:
+                head = self.head()
+                if head[2] is ticket and self.bucket.take():
+                    break
+                self.condition.wait(self.bucket.wait() if head[2] is ticket else None)
+
+            stations = self.queues[priority]
+            stations[station].popleft()
+            if stations[station]:
+                stations.move_to_end(station)
+            else:
+                del stations[station]
+            self.admitted[priority] += 1
+            self.waited[priority] += time.monotonic() - started
+            self.condition.notify_all()
+
+    def depth(self):
+        with self.condition:
+            return dict((priority, sum(len(waiters) for waiters in self.queues[priority].values()))
+                        for priority in PRIORITIES)
+
+    def stats(self):
+        depth = self.depth()
+        with self.condition:
+            return dict((priority, {'waiting': depth[priority], 'admitted': self.admitted[priority],
+                                    'avgWait': self.waited[priority] / self.admitted[priority]
+                                    if self.admitted[priority] else 0.0}) for priority in PRIORITIES)
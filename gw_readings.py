@@ -0,0 +1,164 @@
+import calendar
+from array import array
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+''' compact column oriented container for day readings '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class Reading:
+    '''
+    Reading is a view on one row of a Readings container. It supports both attribute access and the item access of
+    the dict entries returned by getDayReadings (reading['dt'], reading['pgrid_w'], reading['eday_kwh']).
+    '''
+
+    __slots__ = ('readings', 'index')
+
+    def __init__(self, readings, index):
+        self.readings = readings
+        self.index = index
+
+    @property
+    def dt(self):
+        return EPOCH + timedelta(seconds=self.readings.epoch[self.index])
+
+    @property
+    def pgrid_w(self):
+        return self.readings.pgrid_w[self.index]
+
+    @property
+    def eday_kwh(self):
+        return self.readings.eday_kwh[self.index]
+
+    def __getitem__(self, key):
+        if key not in ('dt', 'pgrid_w', 'eday_kwh'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self):
+        return ('dt', 'pgrid_w', 'eday_kwh')
+
+    def asDict(self):
+        return {'dt': self.dt, 'pgrid_w': self.pgrid_w, 'eday_kwh': self.eday_kwh}
+
+    def __repr__(self):
+        return "Reading({0})".format(self.asDict())
+
+
+class Readings:
+    '''
+    Readings stores day readings as three typed arrays: epoch seconds (int64), power in W and cumulative energy in
+    kWh (both float32), which takes 16 bytes per sample instead of the few hundred bytes of a dict with a datetime
+    and two floats. Indexing and iterating give Reading views, so code written for the list of dicts keeps working.
+
+    The datetimes of getDayReadings are naive station times, they are stored as if they were UTC so they round trip
+    unchanged.
+
+    toNumpy and toArrow export the columns without copying the data.
+    '''
+
+    __slots__ = ('epoch', 'pgrid_w', 'eday_kwh')
+
+    def __init__(self):
+        self.epoch = array('q')
+        self.pgrid_w = array('f')
+        self.eday_kwh = array('f')
+
+    @classmethod
+    def fromEntries(cls, entries):
+        readings = cls()
+        for entry in entries:
+            readings.append(entry['dt'], entry['pgrid_w'], entry['eday_kwh'])
+        return readings
+
+    @classmethod
+    def fromColumns(cls, columns):
+        '''
+        fromColumns builds a container from the column oriented result of gw_vector.integrateDay.
+        '''
+        if np is None or not isinstance(columns['dt'], np.ndarray):
+            return cls.fromEntries({'dt': dt, 'pgrid_w': pgrid_w, 'eday_kwh': eday_kwh}
+                                   for dt, pgrid_w, eday_kwh in zip(columns['dt'], columns['pgrid_w'],
+                                                                    columns['eday_kwh']))
+        readings = cls()
+        readings.epoch.frombytes(columns['dt'].astype('datetime64[s]').astype(np.int64).tobytes())
+        readings.pgrid_w.frombytes(np.asarray(columns['pgrid_w'], dtype=np.float32).tobytes())
+        readings.eday_kwh.frombytes(np.asarray(columns['eday_kwh'], dtype=np.float32).tobytes())
+        return readings
+
+    def append(self, dt, pgrid_w, eday_kwh):
+        self.epoch.append(calendar.timegm(dt.timetuple()))
+        self.pgrid_w.append(pgrid_w)
+        self.eday_kwh.append(eday_kwh)
+
+    def extend(self, other):
+        self.epoch.extend(other.epoch)
+        self.pgrid_w.extend(other.pgrid_w)
+        self.eday_kwh.extend(other.eday_kwh)
+
+    def __len__(self):
+        return len(self.epoch)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Reading(self, n) for n in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Reading(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Reading(self, index)
+
+    @property
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in (self.epoch, self.pgrid_w, self.eday_kwh))
+
+    def toEntries(self):
+        return [reading.asDict() for reading in self]
+
+    def toNumpy(self):
+        '''
+        toNumpy returns the columns as NumPy arrays sharing memory with this container. While any of the arrays (or a
+        view of them) is alive the container cannot grow: append and extend raise BufferError, so drop the arrays or
+        take a copy before adding readings.
+        '''
+        if np is None:
+            raise ImportError("toNumpy requires numpy")
+        return {
+            'epoch': np.frombuffer(self.epoch, dtype=np.int64),
+            'pgrid_w': np.frombuffer(self.pgrid_w, dtype=np.float32),
+            'eday_kwh': np.frombuffer(self.eday_kwh, dtype=np.float32)
+        }
+
+    def toArrow(self):
+        '''
+        toArrow returns a pyarrow Table whose buffers point at the memory of this container. As with toNumpy,
+        append and extend raise BufferError while the table (or an array or slice of it) is alive.
+        '''
+        if pa is None:
+            raise ImportError("toArrow requires pyarrow")
+        length = len(self)
+        return pa.Table.from_arrays([
+            pa.Array.from_buffers(pa.timestamp('s'), length, [None, pa.py_buffer(self.epoch)]),
+            pa.Array.from_buffers(pa.float32(), length, [None, pa.py_buffer(self.pgrid_w)]),
+            pa.Array.from_buffers(pa.float32(), length, [None, pa.py_buffer(self.eday_kwh)])
+        ], names=['dt', 'pgrid_w', 'eday_kwh'])
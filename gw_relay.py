@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from gw_api import GoodWeApi
+from gw_daemon import stationIds
+from gw_fleet import FleetPoller, isEmpty
+
+''' local relay that shares one upstream poll between many consumers '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+class Relay:
+    '''
+    Relay polls every station once per interval with a FleetPoller and serves the latest results to local clients
+    over http, so the load on the SEMS api is the same however many dashboards, alerts and bridges read from it:
+
+        GET /stations                   the station ids with the ETag of their snapshot
+        GET /stations/<id>              the snapshot as json, with an ETag; If-None-Match gives 304 when unchanged.
+                                        With ?wait=<seconds> and If-None-Match the request is held until the
+                                        snapshot changes (long poll), 304 when it did not change within the wait.
+                                        The wait is capped at maxWait seconds, a wait that is not a number is a 400.
+        GET /stations/<id>/events       server-sent events, the snapshot now and after every change
+
+    A snapshot only changes, and waiting clients are only woken, when the polled results differ from the previous
+    ones. A failed poll, or results with a method that returned no data, leave the last good snapshot in place.
+    Every client connection is served by its own thread, which suits the local consumers it is meant for.
+    '''
+
+    def __init__(self, api, station_ids, methods=('getCurrentReadings', 'getRawPsPowerFlow'), interval=60, workers=8,
+                 host='127.0.0.1', port=8081, keepalive=15, maxWait=300):
+        self.poller = FleetPoller(api, station_ids, methods=methods, interval=interval, workers=workers,
+                                  callback=self.publish)
+        self.keepalive = keepalive
+        self.maxWait = maxWait
+        self.snapshots = dict((station_id, None) for station_id in station_ids)
+        self.condition = threading.Condition()
+        self.stopped = False
+
+        handler = type('RelayHandler', (RelayHandler,), {'relay': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = 'http://{0}:{1}/'.format(host, self.httpd.server_port)
+        self.threads = []
+
+    def publish(self, station, results):
+        if any(isEmpty(result) for result in results.values()):
+            return
+        results = json.dumps(results, default=str, sort_keys=True)
+        etag = '"{0}"'.format(hashlib.blake2b(results.encode(), digest_size=8).hexdigest())
+        with self.condition:
+            snapshot = self.snapshots.get(station)
+            if snapshot is not None and snapshot[0] == etag:
+                return
+            body = '{{"station": {0}, "updated": {1}, "results": {2}}}'.format(json.dumps(station), time.time(),
+                                                                              results).encode()
+            self.snapshots[station] = (etag, body)
+            self.condition.notify_all()
+
+    def snapshot(self, station, etag=None, wait=0):
+        '''
+        snapshot returns the (etag, body) of station, or None while it has not been polled yet. It waits up to wait
+        seconds for a snapshot with an etag other than the given one.
+        '''
+        deadline = time.monotonic() + wait
+        with self.condition:
+            while not self.stopped:
+                snapshot = self.snapshots[station]
+                remaining = deadline - time.monotonic()
+                if (snapshot is not None and snapshot[0] != etag) or remaining <= 0:
+                    return snapshot
+                self.condition.wait(remaining)
+            return self.snapshots[station]
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.poller.run, daemon=True),
+                        threading.Thread(target=self.httpd.serve_forever, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.poller.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class RelayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    relay = None
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        parts = [part for part in path.split('/') if part]
+        if parts == ['stations']:
+            with self.relay.condition:
+                stations = dict((station, snapshot[0] if snapshot else None)
+                                for station, snapshot in self.relay.snapshots.items())
+            self.sendBody(200, json.dumps(stations).encode())
+        elif len(parts) in (2, 3) and parts[0] == 'stations' and parts[1] in self.relay.snapshots:
+            if len(parts) == 3 and parts[2] == 'events':
+                self.sendEvents(parts[1])
+            elif len(parts) == 2:
+                try:
+                    wait = float(dict(parse_qsl(query)).get('wait', 0))
+                except ValueError:
+                    wait = math.nan
+                if math.isfinite(wait):
+                    self.sendSnapshot(parts[1], min(max(wait, 0.0), self.relay.maxWait))
+                else:
+                    self.send_error(400, "wait must be a number of seconds")
+            else:
+                self.send_error(404)
+        else:
+            self.send_error(404)
+
+    def sendBody(self, status, body, etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def sendSnapshot(self, station, wait):
+        etag = self.headers.get('If-None-Match')
+        snapshot = self.relay.snapshot(station, etag, wait)
+        if snapshot is None:
+            self.send_error(503, "Station not polled yet")
+        elif snapshot[0] == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.sendBody(200, snapshot[1], snapshot[0])
+
+    def sendEvents(self, station):
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        etag = self.headers.get('Last-Event-ID')
+        try:
+            while not self.relay.stopped:
+                snapshot = self.relay.snapshot(station, etag, self.relay.keepalive)
+                if snapshot is None or snapshot[0] == etag:
+                    self.wfile.write(b': keepalive\n\n')
+                else:
+                    etag = snapshot[0]
+                    self.wfile.write(b'id: ' + etag.encode() + b'\nevent: snapshot\ndata: ' + snapshot[1] + b'\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the latest GoodWe readings to local clients.")
+    parser.add_argument('--config', default='goodweConfig.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--interval', type=int, default=60)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.config) as configFile:
+        account = json.load(configFile)['account']
+
+    stations = stationIds(account)
+    with GoodWeApi(stations[0], account['username'], account['password']) as api:
+        relay = Relay(api, stations, interval=args.interval, host=args.host, port=args.port).start()
+        print("GoodWe relay on " + relay.url)
+        try:
+            relay.threads[0].join()
+        except KeyboardInterrupt:
+            relay.stop()
+
+
+if __name__ == '__main__':
+    main()
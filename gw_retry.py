@@ -0,0 +1,118 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+''' retry policy for calls to the GoodWe API '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+class RetryBudget:
+    '''
+    RetryBudget limits retries to a fraction of the calls made. Every call deposits ratio tokens, every retry takes
+    one token out. minRetries tokens are always available so a client that has only just started can still retry.
+    With a budget shared by all clients a failing endpoint can only spend its share of retries, instead of keeping
+    every worker busy with retries of calls that will fail anyway.
+    '''
+
+    def __init__(self, ratio=0.2, minRetries=10):
+        self.ratio = ratio
+        self.minRetries = minRetries
+        self.balance = float(minRetries)
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.balance = min(self.balance + self.ratio, self.minRetries + 1000 * self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class RetryPolicy:
+    '''
+    RetryPolicy decides whether and how long to wait before a failed call is tried again. The delay is exponential
+    backoff with full jitter: a random value between 0 and min(cap, base * 2 ** attempt). A call is given up after
+    the given number of attempts, when the next try would start after maxElapsed seconds, when the error is not
+    retryable or when the retry budget is used up.
+
+    Connection errors, timeouts and the http statuses in retryStatuses are retryable, other http errors (for example
+    404 on a misspelled endpoint) are not.
+
+    The counters calls, retries, denied (retries refused by the budget or maxElapsed), failures and slept (seconds)
+    are returned by stats().
+    '''
+
+    def __init__(self, attempts=3, base=1.0, cap=30.0, maxElapsed=60.0, retryStatuses=(429, 500, 502, 503, 504),
+                 budget=None):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.maxElapsed = maxElapsed
+        self.retryStatuses = frozenset(retryStatuses)
+        self.budget = budget if budget is not None else RetryBudget()
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+        self.failures = 0
+        self.slept = 0.0
+        self.lock = threading.Lock()
+
+    def start(self):
+        '''
+        start is called once per call and returns the start time to pass to backoff.
+        '''
+        self.budget.deposit()
+        with self.lock:
+            self.calls += 1
+        return time.monotonic()
+
+    def isRetryable(self, exp):
+        if isinstance(exp, requests.exceptions.HTTPError):
+            return exp.response is not None and exp.response.status_code in self.retryStatuses
+        return isinstance(exp, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    def backoff(self, attempt, started):
+        '''
+        backoff returns the number of seconds to wait before attempt + 1, or None when the call should be given up.
+        attempt counts from 0.
+        '''
+        if attempt + 1 >= self.attempts:
+            self.fail()
+            return None
+
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        if time.monotonic() - started + delay > self.maxElapsed or not self.budget.withdraw():
+            with self.lock:
+                self.denied += 1
+            self.fail()
+            return None
+
+        with self.lock:
+            self.retries += 1
+            self.slept += delay
+        return delay
+
+    def fail(self):
+        with self.lock:
+            self.failures += 1
+
+    def sleep(self, delay):
+        time.sleep(delay)
+
+    async def asleep(self, delay):
+        await asyncio.sleep(delay)
+
+    def stats(self):
+        with self.lock:
+            return {'calls': self.calls, 'retries': self.retries, 'denied': self.denied, 'failures': self.failures,
+                    'slept': self.slept}
@@ -0,0 +1,183 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from gw_adaptive import readingValue
+from gw_schema import STATUS
+
+''' shared memory ring buffer of live readings for processes on the same host '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+MAGIC = b'GWRING2\x00'
+
+# magic, capacity, record size, number of records written; padded to a cache line
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+COUNT_OFFSET = 16
+
+# sequence, time, pgrid_w, eday_kwh, grid_voltage, status, station; 96 bytes, so every record stays 8 byte aligned.
+# The station field holds a SEMS station id (a 36 character GUID) with room to spare.
+STATION_SIZE = 52
+RECORD = struct.Struct('<Qddddi{0}s'.format(STATION_SIZE))
+SEQ = struct.Struct('<Q')
+PAYLOAD = struct.Struct('<ddddi{0}s'.format(STATION_SIZE))
+
+STATUS_CODES = dict((text, code) for code, text in STATUS.items())
+
+Record = namedtuple('Record', ['station', 'time', 'pgrid_w', 'eday_kwh', 'grid_voltage', 'status'])
+
+
+class RingWriter:
+    '''
+    RingWriter publishes readings into a memory mapped file of fixed layout: a 64 byte header followed by capacity
+    records of RECORD.size bytes. Put the file on a tmpfs such as /dev/shm so it never touches the disk.
+
+    Every record is guarded by a sequence lock: its sequence is odd while the record is written and even when it is
+    complete, so readers detect and retry a record that was being overwritten. The number of records written is
+    stored in the header after the record itself. There must be one writer per file, publish is thread safe within it.
+
+    A new writer replaces the file at path instead of truncating it: readers that still map the previous ring keep
+    reading it (it is not written anymore) and have to be opened again to follow the new one.
+    '''
+
+    def __init__(self, path, capacity=1024):
+        self.path = path
+        self.capacity = capacity
+        self.count = 0
+        self.lock = threading.Lock()
+        size = HEADER_SIZE + capacity * RECORD.size
+        # build the ring in a new file and move it over path, never truncate a file other processes may have mapped
+        temp = '{0}.{1}.tmp'.format(path, os.getpid())
+        fd = os.open(temp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+            HEADER.pack_into(self.map, 0, MAGIC, capacity, RECORD.size, 0)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def publish(self, station, reading, when=None):
+        '''
+        publish writes a getCurrentReadings result (a dict or a gw_schema record) as the newest record. A station id
+        longer than STATION_SIZE bytes raises ValueError.
+        '''
+        stationId = str(station).encode()
+        if len(stationId) > STATION_SIZE:
+            raise ValueError("Station id {0} is longer than {1} bytes".format(station, STATION_SIZE))
+        status = readingValue(reading, 'status')
+        payload = (time.time() if when is None else when,
+                   float(readingValue(reading, 'pgrid_w') or 0),
+                   float(readingValue(reading, 'eday_kwh') or 0),
+                   float(readingValue(reading, 'grid_voltage') or 0),
+                   STATUS_CODES.get(status, status if isinstance(status, int) else 0),
+                   stationId)
+        with self.lock:
+            offset = HEADER_SIZE + (self.count % self.capacity) * RECORD.size
+            SEQ.pack_into(self.map, offset, 2 * self.count + 1)
+            PAYLOAD.pack_into(self.map, offset + SEQ.size, *payload)
+            SEQ.pack_into(self.map, offset, 2 * self.count + 2)
+            self.count += 1
+            struct.pack_into('<Q', self.map, COUNT_OFFSET, self.count)
+
+    def wrap(self):
+        '''
+        wrap returns a FleetPoller style callback(system_id, results) that publishes the getCurrentReadings result.
+        '''
+        def onResults(station, results):
+            self.publish(station, results.get('getCurrentReadings', results))
+        return onResults
+
+
+class RingReader:
+    '''
+    RingReader maps a ring written by RingWriter read only. latest() and last(n) read the records straight from the
+    shared mapping, without system calls or deserialisation; a record that is overwritten while it is read is read
+    again, a record the writer has already lapped is left out. With NumPy, records() returns the ring as a structured
+    array on top of the mapping.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as ringFile:
+            self.map = mmap.mmap(ringFile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.capacity, recordSize, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or recordSize != RECORD.size:
+            raise ValueError("{0} is not a GoodWe readings ring".format(path))
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def count(self):
+        return struct.unpack_from('<Q', self.map, COUNT_OFFSET)[0]
+
+    def read(self, n, retries=100):
+        '''
+        read returns record n (0 based, in order of writing), or None when it was overwritten.
+        '''
+        offset = HEADER_SIZE + (n % self.capacity) * RECORD.size
+        for attempt in range(retries):
+            before = SEQ.unpack_from(self.map, offset)[0]
+            if before != 2 * n + 2:
+                if before > 2 * n + 2:
+                    return None
+                continue
+            values = PAYLOAD.unpack_from(self.map, offset + SEQ.size)
+            if SEQ.unpack_from(self.map, offset)[0] == before:
+                when, pgrid_w, eday_kwh, grid_voltage, status, station = values
+                return Record(station.rstrip(b'\x00').decode(), when, pgrid_w, eday_kwh, grid_voltage,
+                              STATUS.get(status, status))
+        return None
+
+    def latest(self):
+        count = self.count
+        return self.read(count - 1) if count else None
+
+    def last(self, n):
+        '''
+        last returns up to n of the newest records, oldest first.
+        '''
+        count = self.count
+        records = (self.read(index) for index in range(max(0, count - min(n, self.capacity)), count))
+        return [record for record in records if record is not None]
+
+    def records(self):
+        '''
+        records returns all slots of the ring as a NumPy structured array that shares memory with the mapping. Slot
+        n % capacity holds record n, slots with an odd seq are being written.
+        '''
+        if np is None:
+            raise ImportError("records requires NumPy")
+        dtype = np.dtype([('seq', '<u8'), ('time', '<f8'), ('pgrid_w', '<f8'), ('eday_kwh', '<f8'),
+                          ('grid_voltage', '<f8'), ('status', '<i4'), ('station', 'S{0}'.format(STATION_SIZE))])
+        return np.frombuffer(self.map, dtype=dtype, count=self.capacity, offset=HEADER_SIZE)
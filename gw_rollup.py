@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+''' incremental hour, day and month aggregates of GoodWe power samples '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rollups (
+    station TEXT NOT NULL,
+    grain TEXT NOT NULL,
+    period TEXT NOT NULL,
+    energy_kwh REAL NOT NULL,
+    peak_w REAL NOT NULL,
+    operating_minutes INTEGER NOT NULL,
+    PRIMARY KEY (station, grain, period)
+);
+CREATE TABLE IF NOT EXISTS rollup_days (
+    station TEXT NOT NULL,
+    date TEXT NOT NULL,
+    last_minute INTEGER NOT NULL,
+    PRIMARY KEY (station, date)
+);
+'''
+
+# period format per grain, periods sort and compare as strings
+GRAINS = {'hour': '%Y-%m-%d %H', 'day': '%Y-%m-%d', 'month': '%Y-%m'}
+
+Rollup = namedtuple('Rollup', ['period', 'energy_kwh', 'peak_w', 'operating_minutes'])
+
+
+class RollupStore:
+    '''
+    RollupStore keeps per station aggregates of the power samples of GetPowerStationPacByDayForApp at hour, day and
+    month grain: the energy (kWh), the peak power (W) and the operating minutes (minutes with power above zero).
+
+    add folds new samples into the aggregates. As in GoodWeApi.integrateDay a sample covers the minutes since the
+    previous sample of its day, the first sample of a day covers the period minutes before it (the sampling period
+    of the station, 5 minutes for SEMS). A sample is split over the hours it covers, so the energy of every period
+    is the integral of the samples over that period; unlike getDayReadings it is not scaled to the day yield, which
+    is only known once the day is over. Per station and day the last folded sample is remembered and older samples
+    are skipped, so the samples of today can be added again as the day grows and days can be added in any order.
+
+    Give a RollupStore to HistoryStore to keep the aggregates up to date with every stored day, rebuild fills them
+    from days stored before.
+    '''
+
+    def __init__(self, path, period=5):
+        self.path = path
+        self.period = period
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, station, pacs):
+        '''
+        add folds the power samples (dicts with date and pac, as returned by the api) into the aggregates of station
+        and returns the number of samples that were new.
+        '''
+        days = {}
+        for sample in pacs:
+            parsed_date = datetime.strptime(sample['date'], "%m/%d/%Y %H:%M:%S")
+            days.setdefault(parsed_date.strftime('%Y-%m-%d'), []).append((parsed_date, sample['pac']))
+
+        totals = {}
+        added = 0
+        with self.lock, self.connection:
+            for date_s, samples in days.items():
+                row = self.connection.execute('SELECT last_minute FROM rollup_days WHERE station = ? AND date = ?',
+                                              (station, date_s)).fetchone()
+                lastMinute = row[0] if row is not None else -1
+                midnight = datetime.strptime(date_s, '%Y-%m-%d')
+                for parsed_date, pac in samples:
+                    next_minutes = parsed_date.hour * 60 + parsed_date.minute
+                    if next_minutes <= lastMinute:
+                        continue
+                    minutes = lastMinute if lastMinute >= 0 else max(0, next_minutes - self.period)
+                    lastMinute = next_minutes
+                    added += 1
+                    # split the minutes the sample covers at the hour boundaries
+                    while minutes < next_minutes:
+                        end = min(next_minutes, (minutes // 60 + 1) * 60)
+                        start = midnight + timedelta(minutes=minutes)
+                        for grain, periodFormat in GRAINS.items():
+                            total = totals.setdefault((grain, start.strftime(periodFormat)), [0.0, 0.0, 0])
+                            total[0] += pac * (end - minutes) / 60000.0
+                            total[1] = max(total[1], pac)
+                            total[2] += end - minutes if pac > 0 else 0
+                        minutes = end
+                if lastMinute >= 0:
+                    self.connection.execute('INSERT OR REPLACE INTO rollup_days VALUES (?, ?, ?)',
+                                            (station, date_s, lastMinute))
+
+            self.connection.executemany(
+                'INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (station, grain, period) DO UPDATE SET '
+                'energy_kwh = energy_kwh + excluded.energy_kwh, peak_w = MAX(peak_w, excluded.peak_w), '
+                'operating_minutes = operating_minutes + excluded.operating_minutes',
+                [(station, grain, period) + tuple(total) for (grain, period), total in totals.items()])
+        return added
+
+    def get(self, station, grain, start, end):
+        '''
+        get returns the Rollups of station at grain ('hour', 'day' or 'month') for the periods from start to end
+        (inclusive, datetime objects), periods without samples are left out.
+        '''
+        periodFormat = GRAINS[grain]
+        with self.lock:
+            rows = self.connection.execute('SELECT period, energy_kwh, peak_w, operating_minutes FROM rollups WHERE '
+                                           'station = ? AND grain = ? AND period BETWEEN ? AND ? ORDER BY period',
+                                           (station, grain, start.strftime(periodFormat),
+                                            end.strftime(periodFormat))).fetchall()
+        return [Rollup(*row) for row in rows]
+
+    def report(self, grain, start, end, stations=None):
+        '''
+        report returns the Rollups of every station (or of the given stations) keyed by station.
+        '''
+        if stations is None:
+            with self.lock:
+                stations = [row[0] for row in self.connection.execute('SELECT DISTINCT station FROM rollups')]
+        return dict((station, self.get(station, grain, start, end)) for station in stations)
+
+    def rebuild(self, history, station, start, end):
+        '''
+        rebuild folds the power samples stored in a HistoryStore from start to end into the aggregates.
+        '''
+        added = 0
+        day = start
+        while day <= end:
+            added += self.add(station, history.getPacs(station, day))
+            day += timedelta(days=1)
+        return added
@@ -0,0 +1,173 @@
+import re
+import string
+from dataclasses import make_dataclass
+
+''' declarative parsers for GoodWe API responses '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+NUMBER = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+# characters of the units that follow a number, "231.5V", "12.3 kWh", "800(W)", "87%"
+UNIT_CHARACTERS = string.ascii_letters + '()% '
+
+
+def toNumber(value):
+    '''
+    toNumber returns value as a float. Strings with a unit such as "231.5V", "1200W", "12.3 kWh" or "800(W)" are
+    parsed up to the unit, a value that holds no number gives None instead of raising. Stripping the unit and
+    calling float is several times faster than the regex, which is only used for the strings float does not take.
+    '''
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    if type(value) is str:
+        try:
+            return float(value.rstrip(UNIT_CHARACTERS))
+        except ValueError:
+            pass
+        match = NUMBER.match(value)
+        return float(match.group(1)) if match else None
+    return None
+
+
+def toText(value):
+    return value if type(value) is str else str(value)
+
+
+def listOf(schema):
+    '''
+    listOf returns a converter that parses every element of a list with schema into a tuple of records.
+    '''
+    return lambda value: tuple(schema.extract(element) for element in value) if type(value) is list else ()
+
+
+def mapping(table):
+    '''
+    mapping returns a converter that looks the value up in table, values not in the table are returned as is.
+    '''
+    return lambda value: table.get(value, value)
+
+
+class Field:
+    '''
+    Field describes one value of a parsed response: the attribute name, the path of keys and list indexes leading to
+    it in the response, the converter and the default used when the value is missing or does not convert.
+    '''
+
+    def __init__(self, name, path, convert=None, default=None):
+        self.name = name
+        self.path = tuple(path)
+        self.convert = convert
+        self.default = default
+
+
+class Schema:
+    '''
+    Schema turns a response into a record with one attribute per Field. The fields are compiled once into a single
+    generated function (its source is kept in source): paths that share a prefix walk it once, missing keys and
+    short lists fall back to the field default by plain checks instead of exceptions. The record class is a
+    dataclass with __slots__.
+
+    Measured with benchmarks/bench_parse.py (best of several runs, the machine was noisy): CURRENT_READINGS takes
+    about 1.3us per response against 2.7us for GoodWeApi.parseCurrentReadings, and retains 129 instead of 294
+    bytes. CURRENT_READINGS_ALL is not faster than the dict code, 7.0us against 6.2us for four inverters as it
+    builds a record per inverter, but retains half the memory (721 against 1471 bytes).
+    '''
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = list(fields)
+        self.record = make_dataclass(name, [field.name for field in self.fields], slots=True)
+        self.extract = self.compile()
+
+    def compile(self):
+        namespace = {'record': self.record, 'EMPTY': {}}
+        lines = ['def extract(data):']
+        nodes = {(): 'data'}
+        # nodes that are looked up by key, as a dict (EMPTY when the node is no dict) so the type is checked once
+        dicts = {}
+
+        for n, field in enumerate(self.fields):
+            for depth in range(1, len(field.path) + 1):
+                prefix = field.path[:depth]
+                if prefix in nodes:
+                    continue
+                parent = nodes[prefix[:-1]]
+                node = 'node{0}'.format(len(nodes))
+                key = prefix[-1]
+                if isinstance(key, int):
+                    lines.append('    {0} = {1}[{2}] if type({1}) is list and len({1}) > {2} else None'.format(
+                        node, parent, key))
+                else:
+                    if parent not in dicts:
+                        dicts[parent] = 'dict' + parent
+                        lines.append('    {0} = {1} if type({1}) is dict else EMPTY'.format(dicts[parent], parent))
+                    lines.append('    {0} = {1}.get({2!r})'.format(node, dicts[parent], key))
+                nodes[prefix] = node
+
+            value = 'value{0}'.format(n)
+            namespace['default{0}'.format(n)] = field.default
+            if field.convert is None:
+                lines.append('    {0} = {1}'.format(value, nodes[field.path]))
+            else:
+                namespace['convert{0}'.format(n)] = field.convert
+                lines.append('    {0} = convert{1}({2}) if {2} is not None else None'.format(value, n,
+                                                                                          nodes[field.path]))
+            if field.default is not None:
+                lines.append('    if {0} is None: {0} = default{1}'.format(value, n))
+
+        values = ', '.join('value{0}'.format(n) for n in range(len(self.fields)))
+        lines.append('    return record({0})'.format(values))
+        self.source = '\n'.join(lines)
+        exec(compile(self.source, '<schema {0}>'.format(self.name), 'exec'), namespace)
+        return namespace['extract']
+
+    def parse(self, data):
+        return self.extract(data)
+
+
+STATUS = {-1: 'Offline', 1: 'Normal'}
+
+
+def inverterFields(prefix=()):
+    prefix = tuple(prefix)
+    return [
+        Field('sn', prefix + ('sn',), toText),
+        Field('status', prefix + ('status',), mapping(STATUS)),
+        Field('pgrid_w', prefix + ('out_pac',), toNumber, 0.0),
+        Field('eday_kwh', prefix + ('eday',), toNumber, 0.0),
+        Field('etotal_kwh', prefix + ('etotal',), toNumber, 0.0),
+        Field('grid_voltage', prefix + ('output_voltage',), toNumber, 0.0),
+    ]
+
+
+# per inverter readings, an element of inverter in GetMonitorDetailByPowerstationId
+INVERTER = Schema('InverterReading', inverterFields())
+
+# the readings of getCurrentReadings from GetMonitorDetailByPowerstationId
+CURRENT_READINGS = Schema('CurrentReadings', inverterFields(('inverter', 0)) + [
+    Field('latitude', ('info', 'latitude'), toNumber),
+    Field('longitude', ('info', 'longitude'), toNumber),
+])
+
+# as CURRENT_READINGS, with the readings of every inverter of the station in inverters
+CURRENT_READINGS_ALL = Schema('CurrentReadingsAll', CURRENT_READINGS.fields + [
+    Field('inverters', ('inverter',), listOf(INVERTER), ()),
+])
+
+# GetPowerFlow, values are returned as strings like "1200(W)"
+POWER_FLOW = Schema('PowerFlow', [
+    Field('pv_w', ('pv',), toNumber, 0.0),
+    Field('load_w', ('load',), toNumber, 0.0),
+    Field('grid_w', ('grid',), toNumber, 0.0),
+    Field('battery_w', ('bettery',), toNumber, 0.0),
+    Field('soc', ('soc',), toNumber),
+    Field('pv_status', ('pvStatus',)),
+    Field('load_status', ('loadStatus',)),
+    Field('grid_status', ('gridStatus',)),
+])
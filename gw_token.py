@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import threading
+
+''' token state shared between GoodWeApi instances of the same account '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+class TokenManager:
+    '''
+    TokenManager holds the token and the regional api url returned by CrossLogin for one account. All GoodWeApi
+    instances created for the stations of an account (see GoodWeApi.forStation) share one TokenManager, so the
+    account logs in once instead of once per station.
+
+    Logins are single-flight: refresh takes the token that was rejected, and when several threads see the same
+    token rejected only the first one logs in, the others find the token already replaced and reuse the new one.
+    This keeps the login traffic at one CrossLogin per token expiry, however many calls failed on it.
+
+    When a path is given the token is written to that file after every login and read back on start, so a restarted
+    process continues with the token of the previous run instead of logging in again. The file holds the token in
+    plain text and is created readable for the owner only.
+    '''
+
+    DEFAULT_TOKEN = '{"version":"v2.0.4","client":"ios","language":"en"}'
+    GLOBAL_URL = 'https://globalapi.sems.com.cn/api/'
+
+    # codes the SEMS api returns for a missing or expired token
+    AUTH_FAILURE_CODES = (100001, 100002)
+
+    def __init__(self, account, password, global_url=GLOBAL_URL, path=None):
+        self.account = account
+        self.password = password
+        self.global_url = global_url
+        self.base_url = global_url
+        self.token = self.DEFAULT_TOKEN
+        self.path = path
+        self.logins = 0
+        self.lock = threading.Lock()
+        if path is not None:
+            self.load()
+
+    def isLoggedIn(self):
+        return self.token != self.DEFAULT_TOKEN
+
+    def refresh(self, staleToken, login):
+        '''
+        refresh replaces staleToken with a new one. login is called without arguments and must return the tuple
+        (api url, token) of a CrossLogin. When the current token differs from staleToken another thread has already
+        refreshed it and login is not called.
+        '''
+        with self.lock:
+            if self.token != staleToken:
+                return
+            self.base_url, self.token = login()
+            self.logins += 1
+            if self.path is not None:
+                self.save()
+
+    @classmethod
+    def isAuthFailure(cls, data):
+        '''
+        isAuthFailure tells a rejected token apart from other unsuccessful responses, a response with data null and
+        msg success is an empty result and not an auth failure.
+        '''
+        if data.get('code') in cls.AUTH_FAILURE_CODES:
+            return True
+        msg = str(data.get('msg', '')).lower()
+        return 'log in' in msg or 'login' in msg or 'authorization' in msg
+
+    def load(self):
+        try:
+            with open(self.path) as tokenFile:
+                stored = json.load(tokenFile)
+        except (OSError, ValueError):
+            return
+
+        if stored.get('account') == self.account and stored.get('token'):
+            self.base_url = stored['api']
+            self.token = stored['token']
+
+    def save(self):
+        stored = {'account': self.account, 'api': self.base_url, 'token': self.token}
+        tmpPath = self.path + '.tmp'
+        try:
+            fd = os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as tokenFile:
+                json.dump(stored, tokenFile)
+            os.replace(tmpPath, self.path)
+        except OSError as exp:
+            logging.warning("Could not store token: {0}".format(exp))
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+''' NumPy implementation of the day power curve integration '''
+__author__ = "Johan Louwers"
+__copyright__ = "Copyright 2019, Johan Louwers"
+__license__ = "MIT"
+__email__ = "louwersj@gmail.com"
+
+
+# position of the hour and minute digits in "%m/%d/%Y %H:%M:%S"
+SAMPLE_DATE_LENGTH = 19
+HOUR = slice(11, 13)
+MINUTE = slice(14, 16)
+
+
+def minutesOfDay(dates):
+    '''
+    minutesOfDay parses the sample dates of GetPowerStationPacByDayForApp ("%m/%d/%Y %H:%M:%S") into minutes since
+    midnight. Fixed width dates are parsed in bulk from their character codes, other dates fall back to strptime.
+    '''
+    dates = np.asarray(dates, dtype='U{0}'.format(SAMPLE_DATE_LENGTH + 1))
+    if len(dates) and (np.char.str_len(dates) == SAMPLE_DATE_LENGTH).all():
+        digits = dates.astype('U{0}'.format(SAMPLE_DATE_LENGTH)).view(np.uint32)
+        digits = digits.reshape(len(dates), SAMPLE_DATE_LENGTH).astype(np.int64) - ord('0')
+        return (digits[:, HOUR] @ [600, 60]) + (digits[:, MINUTE] @ [10, 1])
+
+    parsed = [datetime.strptime(value, "%m/%d/%Y %H:%M:%S") for value in dates]
+    return np.array([value.hour * 60 + value.minute for value in parsed], dtype=np.int64)
+
+
+def integrateDay(date, eday_kwh, pacs):
+    '''
+    integrateDay is the column oriented counterpart of GoodWeApi.integrateDay: the same entries, but returned as a
+    dict of arrays (dt as datetime64[m], pgrid_w and eday_kwh) instead of a list of dicts. Without NumPy installed
+    the columns are plain lists computed by the loop implementation.
+    '''
+    if np is None:
+        from gw_api import GoodWeApi
+        entries = GoodWeApi.integrateDay(date, eday_kwh, pacs)
+        return {key: [entry[key] for entry in entries] for key in ('dt', 'pgrid_w', 'eday_kwh')}
+
+    pac = np.fromiter((sample['pac'] for sample in pacs), dtype=np.float64, count=len(pacs))
+    minuteOfDay = minutesOfDay([sample['date'] for sample in pacs])
+    minutes = np.diff(minuteOfDay, prepend=0)
+
+    power = pac * minutes
+    eday_from_power = power.sum()
+    factor = eday_kwh / eday_from_power if eday_from_power > 0 else 1
+
+    increase = power * factor
+    keep = increase > 0
+    start = np.datetime64(date, 'm') + np.cumsum(minutes)[keep].astype('timedelta64[m]')
+    return {
+        'dt': start,
+        'pgrid_w': pac[keep],
+        'eday_kwh': np.round(np.cumsum(increase[keep]), 3)
+    }
+
+
+def toEntries(columns):
+    '''
+    toEntries converts the result of integrateDay back to the list of dicts returned by GoodWeApi.integrateDay.
+    '''
+    if np is None or not isinstance(columns['dt'], np.ndarray):
+        return [{'dt': dt, 'pgrid_w': pgrid_w, 'eday_kwh': eday_kwh}
+                for dt, pgrid_w, eday_kwh in zip(columns['dt'], columns['pgrid_w'], columns['eday_kwh'])]
+    epoch = datetime(1970, 1, 1)
+    return [{'dt': epoch + timedelta(minutes=int(dt)), 'pgrid_w': pgrid_w, 'eday_kwh': eday_kwh}
+            for dt, pgrid_w, eday_kwh in zip(columns['dt'].astype(np.int64), columns['pgrid_w'].tolist(),
+                                             columns['eday_kwh'].tolist())]
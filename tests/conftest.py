@@ -0,0 +1,41 @@
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gw_api import GoodWeApi
+from gw_fakeserver import FakeSemsServer
+from gw_retry import RetryPolicy
+
+
+@pytest.fixture(autouse=True)
+def quietLogging():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def server():
+    with FakeSemsServer() as fake:
+        yield fake
+
+
+def makeApi(server, cls=GoodWeApi, **kwargs):
+    '''
+    makeApi returns a client for station S pointed at the fake server, retrying without noticeable delays.
+    '''
+    kwargs.setdefault('retry', RetryPolicy(base=0.01, cap=0.05))
+    api = cls('S', 'user', 'secret', **kwargs)
+    api.global_url = api.base_url = server.url
+    return api
+
+
+@pytest.fixture
+def api(server):
+    client = makeApi(server)
+    yield client
+    client.close()
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from gw_adaptive import AdaptiveScheduler, isDaylight, sunTimes
+
+
+def epoch(year, month, day, hour, minute, utcOffset):
+    return datetime(year, month, day, hour, minute, tzinfo=timezone(timedelta(hours=utcOffset))).timestamp()
+
+
+@pytest.mark.parametrize('name, latitude, longitude, when, up', [
+    ('Amsterdam noon', 52.37, 4.89, epoch(2020, 6, 21, 12, 0, 2), True),
+    ('Amsterdam midnight', 52.37, 4.89, epoch(2020, 6, 21, 0, 30, 2), False),
+    ('Sydney morning', -33.87, 151.21, epoch(2020, 1, 15, 9, 0, 11), True),
+    ('Sydney night', -33.87, 151.21, epoch(2020, 1, 15, 23, 0, 11), False),
+    ('Auckland morning', -36.85, 174.76, epoch(2020, 1, 15, 10, 0, 13), True),
+    ('Los Angeles evening', 34.05, -118.24, epoch(2020, 6, 21, 18, 0, -7), True),
+    ('Los Angeles night', 34.05, -118.24, epoch(2020, 6, 21, 23, 0, -7), False),
+    ('Honolulu morning', 21.31, -157.86, epoch(2020, 3, 1, 9, 0, -10), True),
+])
+def test_daylight_around_the_world(name, latitude, longitude, when, up):
+    assert isDaylight(latitude, longitude, when, margin=0) == up
+
+
+def test_sun_times_bracket_local_noon():
+    when = epoch(2020, 1, 15, 9, 0, 11)
+    sunrise, sunset, up = sunTimes(-33.87, 151.21, when)
+    assert sunrise < when < sunset
+    assert sunset - sunrise == pytest.approx(14.2 * 3600, abs=1800)
+
+
+def test_polar_day_and_night():
+    assert sunTimes(78.2, 15.6, epoch(2020, 6, 21, 12, 0, 2)) == (None, None, True)
+    assert sunTimes(78.2, 15.6, epoch(2020, 12, 21, 12, 0, 1)) == (None, None, False)
+
+
+def test_scheduler_slows_down_in_the_dark():
+    scheduler = AdaptiveScheduler(interval=60, slowInterval=900)
+    reading = {'pgrid_w': 2000, 'status': 'Normal', 'latitude': -33.87, 'longitude': 151.21}
+    assert scheduler.nextInterval('S', reading, now=epoch(2020, 1, 15, 9, 0, 11)) == 60
+    assert scheduler.nextInterval('S', dict(reading, pgrid_w=2001), now=epoch(2020, 1, 15, 23, 0, 11)) == 900
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from conftest import makeApi
+from gw_async import AsyncGoodWeApi
+from gw_cache import ResponseCache
+from gw_retry import RetryBudget, RetryPolicy
+from gw_token import TokenManager
+
+
+def test_first_call_logs_in_once(server, api):
+    assert api.getRawPsSoc() == {'powerStationId': 'S'}
+    assert api.getRawPsSoc() == {'powerStationId': 'S'}
+    assert server.stats()['logins'] == 1
+
+
+def test_concurrent_calls_share_one_login(server, api):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda n: api.forStation('S{0}'.format(n)).getRawPsSoc(), range(16)))
+    assert [result['powerStationId'] for result in results] == ['S{0}'.format(n) for n in range(16)]
+    assert server.stats()['logins'] == 1
+
+
+def test_expired_token_is_refreshed_once(server, api):
+    api.getRawPsSoc()
+    server.expireTokens()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda n: api.getRawPsSoc(), range(8)))
+    assert all(result == {'powerStationId': 'S'} for result in results)
+    assert server.stats()['logins'] == 2
+    assert api.tokens.logins == 2
+
+
+def test_token_survives_restart(server, tmp_path):
+    path = str(tmp_path / 'token.json')
+    first = makeApi(server, token_path=path)
+    first.getRawPsSoc()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    second = makeApi(server, tokens=TokenManager('user', 'secret', global_url=server.url, path=path))
+    assert second.tokens.isLoggedIn()
+    assert second.getRawPsSoc() == {'powerStationId': 'S'}
+    assert server.stats()['logins'] == 1
+
+
+def test_server_errors_are_retried_then_given_up(server):
+    server.errorRate = 1.0
+    retry = RetryPolicy(attempts=3, base=0.01, cap=0.05)
+    api = makeApi(server, retry=retry)
+    assert api.getRawPsSoc() == {}
+    assert retry.stats()['retries'] == 2
+    assert retry.stats()['failures'] == 1
+
+
+def test_recovers_after_transient_error(server):
+    retry = RetryPolicy(attempts=3, base=0.01, cap=0.05)
+    api = makeApi(server, retry=retry)
+    api.getRawPsSoc()
+    respond = server.respond
+    failures = [(500, {'hasError': True, 'code': 500, 'msg': 'internal error', 'data': None})]
+    server.respond = lambda *args: failures.pop() if failures else respond(*args)
+
+    assert api.getRawPsSoc() == {'powerStationId': 'S'}
+    assert retry.stats()['retries'] == 1
+
+
+def test_retry_budget_limits_retries(server):
+    server.errorRate = 1.0
+    retry = RetryPolicy(attempts=5, base=0.001, cap=0.001, budget=RetryBudget(ratio=0.0, minRetries=2))
+    api = makeApi(server, retry=retry)
+    for n in range(3):
+        assert api.getRawPsSoc() == {}
+    assert retry.stats()['retries'] == 2
+    assert retry.stats()['denied'] == 3
+
+
+def test_unreachable_host_is_not_fatal(server):
+    api = makeApi(server, retry=RetryPolicy(attempts=2, base=0.01, cap=0.01))
+    api.global_url = api.base_url = 'http://127.0.0.1:9/api/'
+    assert api.getRawPsSoc() == {}
+
+
+def test_cache_serves_repeated_calls(server):
+    cache = ResponseCache()
+    api = makeApi(server, cache=cache)
+    for n in range(5):
+        api.getRawPsPowerstationById()
+    assert server.stats()['endpoints']['PowerStation/GetPowerStationById'] == 1
+    assert cache.stats()['hits'] == 4
+
+
+def test_cache_skips_uncached_endpoints(server):
+    api = makeApi(server, cache=ResponseCache())
+    for n in range(3):
+        api.getRawPsSoc()
+    assert server.stats()['endpoints']['PowerStation/GetSoc'] == 3
+
+
+def test_cache_coalesces_concurrent_misses(server):
+    server.latency = 0.1
+    cache = ResponseCache()
+    api = makeApi(server, cache=cache)
+    api.getRawPsSoc()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(lambda n: api.getRawPsPowerstationById(), range(10)))
+    assert all(result == results[0] for result in results)
+    assert server.stats()['endpoints']['PowerStation/GetPowerStationById'] == 1
+    assert cache.stats()['coalesced'] > 0
+
+
+def test_async_cache_coalesces_concurrent_misses(server):
+    server.latency = 0.1
+    cache = ResponseCache()
+
+    async def main():
+        api = makeApi(server, cls=AsyncGoodWeApi, cache=cache)
+        await api.getRawPsSoc()
+        return await asyncio.gather(*[api.getRawPsPowerstationById() for n in range(10)])
+
+    results = asyncio.run(main())
+    assert all(result == {'powerStationId': 'S'} for result in results)
+    assert server.stats()['endpoints']['PowerStation/GetPowerStationById'] == 1
+    assert cache.stats()['coalesced'] == 9
+
+
+def test_async_expired_token_is_refreshed_once(server):
+    async def main():
+        api = makeApi(server, cls=AsyncGoodWeApi)
+        await api.getRawPsSoc()
+        server.expireTokens()
+        return await asyncio.gather(*[api.getRawPsSoc() for n in range(8)])
+
+    assert all(result == {'powerStationId': 'S'} for result in asyncio.run(main()))
+    assert server.stats()['logins'] == 2
+
+
+def test_day_readings(server, api):
+    day = api.getDayReadings(datetime(2020, 6, 1), raw=True)
+    assert day['latitude'] == 52.37
+    assert day['eday_kwh'] == 25.0
+    assert len(day['pacs']) == 288
+    assert day['entries'][-1]['eday_kwh'] == 25.0
+
+
+def test_non_json_body_fails_the_call_on_both_decoders(server):
+    server.maintenance = True
+    for fast_json in (False, True):
+        api = makeApi(server, fast_json=fast_json, retry=RetryPolicy(attempts=2, base=0.01, cap=0.01))
+        assert api.getRawPsSoc() == {}
+
+
+def test_iter_readings_streams_every_day(server, api):
+    entries = list(api.iterReadings(datetime(2020, 6, 1), datetime(2020, 6, 3)))
+    assert len(entries) == 3 * 167
+    assert entries[0]['dt'] < entries[-1]['dt']
+    assert 'GetMonitorDetailByPowerstationId' not in str(server.stats()['endpoints'])
+
+
+def test_async_iter_readings_and_fetch_day(server):
+    async def main():
+        api = makeApi(server, cls=AsyncGoodWeApi)
+        day = await api.fetchDay('2020-06-01')
+        entries = [entry async for entry in api.iterReadings(datetime(2020, 6, 1), datetime(2020, 6, 3))]
+        return day, entries
+
+    day, entries = asyncio.run(main())
+    assert day[0] == 25.0 and len(day[1]) == 288
+    assert len(entries) == 3 * 167
+
+
+def test_current_readings_of_a_null_response(server, api):
+    server.nullRate = 1.0
+    readings = api.getCurrentReadings(allInverters=True)
+    assert readings['pgrid_w'] is None and readings['status'] is None
+    assert readings['inverters'] == []
+
+
+def test_login_without_api_url_fails_the_call(server):
+    respond = server.respond
+    server.respond = lambda endpoint, token, form: (200, {'msg': 'success', 'data': {'token': 'x'}}) \
+        if endpoint == 'Common/CrossLogin' else respond(endpoint, token, form)
+    api = makeApi(server, retry=RetryPolicy(attempts=2, base=0.01, cap=0.01))
+    assert api.getRawPsSoc() == {}
+    assert not api.tokens.isLoggedIn()
+
+
+def countFetches(api):
+    fetched = []
+    fetchDay = api.fetchDay
+    api.fetchDay = lambda date_s: (fetched.append(date_s), fetchDay(date_s))[1]
+    return fetched
+
+
+def test_iter_readings_location_and_prefetch_bound(server, api):
+    fetched = countFetches(api)
+    readings = api.iterReadings(datetime(2020, 6, 1), datetime(2020, 6, 10), prefetch=2, location=True)
+    assert next(readings) == {'latitude': 52.37, 'longitude': 4.89}
+    next(readings)
+    time.sleep(0.2)
+    # the day being read and the two days ahead of it
+    assert len(fetched) == 3
+    readings.close()
+
+
+def test_iter_readings_cancels_queued_days(server, api):
+    server.latency = 0.2
+    fetched = countFetches(api)
+    readings = api.iterReadings(datetime(2020, 6, 1), datetime(2020, 6, 10), prefetch=1, location=True)
+    next(readings)
+    readings.close()
+    time.sleep(0.5)
+    assert len(fetched) <= 1
+
+
+def test_async_iter_readings_location(server):
+    async def main():
+        api = makeApi(server, cls=AsyncGoodWeApi)
+        readings = api.iterReadings(datetime(2020, 6, 1), datetime(2020, 6, 2), location=True)
+        items = [item async for item in readings]
+        return items
+
+    items = asyncio.run(main())
+    assert items[0] == {'latitude': 52.37, 'longitude': 4.89}
+    assert len(items) == 1 + 2 * 167
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import gw_backfill
+from gw_backfill import BackfillEngine
+from gw_history import HistoryStore
+
+
+def test_backfill_skips_stored_days(tmp_path, server):
+    with HistoryStore(str(tmp_path / 'history.sqlite')) as store:
+        engine = BackfillEngine('user', 'secret', store, processes=2, concurrency=4, chunkDays=2,
+                                global_url=server.url)
+        assert engine.run(['A', 'B'], datetime(2020, 6, 1), datetime(2020, 6, 4)) == 8
+        assert engine.run(['A', 'B'], datetime(2020, 6, 1), datetime(2020, 6, 5)) == 2
+        assert len(store.getDay('B', datetime(2020, 6, 3))['entries']) == 167
+        assert server.stats()['logins'] == 1
+
+
+def test_concurrency_caps_the_processes(tmp_path, server, monkeypatch):
+    started = []
+
+    class Executor:
+        def __init__(self, max_workers, initializer, initargs):
+            started.append((max_workers, initargs[-1]))
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def submit(self, fn, *args):
+            raise RuntimeError
+
+    monkeypatch.setattr(gw_backfill, 'ProcessPoolExecutor', Executor)
+    with HistoryStore(str(tmp_path / 'history.sqlite')) as store:
+        engine = BackfillEngine('user', 'secret', store, processes=64, concurrency=4, chunkDays=1,
+                                global_url=server.url)
+        try:
+            engine.run(['A'], datetime(2020, 6, 1), datetime(2020, 6, 30))
+        except RuntimeError:
+            pass
+    assert started == [(4, 1)]
@@ -0,0 +1,39 @@
+import json
+import threading
+import time
+
+from gw_daemon import Collector
+from gw_fleet import FleetPoller
+
+
+def writeConfig(path, workers):
+    config = {'account': {'username': 'user', 'password': 'secret', 'converter-id': ['S1', 'S2']},
+              'collector': {'interval': 0.1, 'workers': workers,
+                            'sinks': [{'type': 'jsonl', 'path': path + '.jsonl'}]}}
+    with open(path, 'w') as configFile:
+        json.dump(config, configFile)
+
+
+def test_reload_resizes_the_poll_workers(server, tmp_path, monkeypatch):
+    sizes = []
+    runCycle = FleetPoller.runCycle
+
+    def recordSize(poller, executor, started):
+        sizes.append(executor._max_workers)
+        return runCycle(poller, executor, started)
+
+    monkeypatch.setattr(FleetPoller, 'runCycle', recordSize)
+    path = str(tmp_path / 'config.json')
+    writeConfig(path, 1)
+    collector = Collector(path)
+    collector.api.global_url = collector.api.base_url = server.url
+    runner = threading.Thread(target=collector.run)
+    runner.start()
+    time.sleep(0.3)
+
+    writeConfig(path, 4)
+    collector.reload()
+    time.sleep(0.3)
+    collector.stop()
+    runner.join(5)
+    assert sizes[0] == 1 and sizes[-1] == 4
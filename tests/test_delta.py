@@ -0,0 +1,30 @@
+from gw_delta import DeltaTracker, flatten
+
+
+def test_flatten_nests_dotted_keys():
+    assert flatten({'a': {'b': 1}, 'c': [2, {'d': 3}]}) == {'a.b': 1, 'c.0': 2, 'c.1.d': 3}
+
+
+def test_first_snapshot_is_full_then_only_changes():
+    tracker = DeltaTracker()
+    first = tracker.update('S', {'pgrid_w': 100, 'status': 'Normal'})
+    assert first.full and first.seq == 1
+    assert tracker.update('S', {'pgrid_w': 100, 'status': 'Normal'}) is None
+    delta = tracker.update('S', {'pgrid_w': 100, 'status': 'Offline'})
+    assert delta.changed == {'status': 'Offline'} and not delta.full and delta.seq == 2
+
+
+def test_deadband_suppresses_small_changes():
+    tracker = DeltaTracker(deadbands={'pgrid_w': 10})
+    tracker.update('S', {'reading': {'pgrid_w': 100}})
+    assert tracker.update('S', {'reading': {'pgrid_w': 105}}) is None
+    assert tracker.update('S', {'reading': {'pgrid_w': 109}}) is None
+    assert tracker.update('S', {'reading': {'pgrid_w': 111}}).changed == {'reading.pgrid_w': 111}
+    assert tracker.skipped == 2
+
+
+def test_removed_keys_and_keyframes():
+    tracker = DeltaTracker(keyframe=3)
+    tracker.update('S', {'a': 1, 'b': 2})
+    assert tracker.update('S', {'a': 1}).changed == {'b': None}
+    assert tracker.update('S', {'a': 2}).full
@@ -0,0 +1,91 @@
+import csv
+import os
+from datetime import datetime
+
+import pyarrow.parquet as pq
+
+from gw_export import PAC_COLUMNS, PAC_SCHEMA, Checkpoint, CsvSink, ExportJob, ParquetSink
+
+
+def rows(path):
+    with open(path) as csvFile:
+        return sum(1 for line in csvFile) - 1
+
+
+def test_export_resumes_from_checkpoint(tmp_path, api):
+    output, checkpoint = str(tmp_path / 'pacs.csv'), str(tmp_path / 'pacs.checkpoint')
+    job = ExportJob(api, ['A', 'B'], CsvSink(output, PAC_COLUMNS), Checkpoint(checkpoint))
+    assert job.export(datetime(2020, 6, 1), datetime(2020, 6, 3)) == 6
+    assert rows(output) == 6 * 288
+
+    job = ExportJob(api, ['A', 'B', 'C'], CsvSink(output, PAC_COLUMNS), Checkpoint(checkpoint))
+    assert job.export(datetime(2020, 6, 1), datetime(2020, 6, 3)) == 3
+    assert rows(output) == 9 * 288
+
+
+def test_failed_days_and_today_are_not_checkpointed(tmp_path, server, api):
+    output, checkpoint = str(tmp_path / 'pacs.csv'), str(tmp_path / 'pacs.checkpoint')
+    respond = server.respond
+    server.respond = lambda endpoint, token, form: (200, {'msg': 'success', 'data': {}}) \
+        if form.get('date') == '2020-06-02' and endpoint.endswith('PacByDayForApp') else respond(endpoint, token, form)
+
+    job = ExportJob(api, ['A'], CsvSink(output, PAC_COLUMNS), Checkpoint(checkpoint))
+    assert job.export(datetime(2020, 6, 1), datetime(2020, 6, 4), today=datetime(2020, 6, 4)) == 2
+
+    server.respond = respond
+    job = ExportJob(api, ['A'], CsvSink(output, PAC_COLUMNS), Checkpoint(checkpoint))
+    assert job.export(datetime(2020, 6, 1), datetime(2020, 6, 4), today=datetime(2020, 6, 5)) == 2
+    assert Checkpoint(checkpoint).isDone(('A', '2020-06-01', '2020-06-04'), '2020-06-04')
+
+
+def test_parquet_parts_share_one_schema(tmp_path, api):
+    output = str(tmp_path / 'pacs')
+    sink = ParquetSink(output, PAC_SCHEMA, rowsPerFile=1)
+    sink.write([{'station': 'A', 'date': '2020-06-01', 'sample': '06/01/2020 12:00:00', 'pac': 1200}])
+    sink.write([{'station': 'A', 'date': '2020-06-02', 'sample': '06/02/2020 12:00:00', 'pac': 1200.5}])
+    sink.close()
+    table = pq.read_table(output)
+    assert table.num_rows == 2
+    assert str(table.schema.field('pac').type) == 'double'
+
+
+def test_interrupted_parquet_export_stays_readable(tmp_path):
+    output = str(tmp_path / 'pacs')
+    sink = ParquetSink(output, PAC_SCHEMA)
+    sink.write([{'station': 'A', 'date': '2020-06-01', 'sample': '06/01/2020 12:00:00', 'pac': 1200}])
+    sink.close()
+    interrupted = ParquetSink(output, PAC_SCHEMA)
+    interrupted.write([{'station': 'A', 'date': '2020-06-02', 'sample': '06/02/2020 12:00:00', 'pac': 1200}])
+    assert pq.read_table(output).num_rows == 1
+
+    ParquetSink(output, PAC_SCHEMA)
+    assert os.listdir(output) == ['part-00000.parquet']
+
+
+def rawResponder(respond):
+    def rawRespond(endpoint, token, form):
+        if endpoint.endswith('ExportPowerstationPac'):
+            station = form['powerStationId']
+            return 200, {'msg': 'success', 'data': [{'date': '06/01/2020', 'pac': 1200 if station == 'A' else 1200.5,
+                                                     'info': {'unit': 'W'}}]}
+        return respond(endpoint, token, form)
+    return rawRespond
+
+
+def test_raw_export_keeps_the_response_fields(tmp_path, server, api):
+    server.respond = rawResponder(server.respond)
+    output = str(tmp_path / 'raw.csv')
+    job = ExportJob(api, ['A', 'B'], CsvSink(output), Checkpoint(str(tmp_path / 'raw.checkpoint')))
+    assert job.exportRaw('getRawPsExportPowerstationPac') == 2
+    with open(output) as csvFile:
+        rows = list(csv.DictReader(csvFile))
+    assert [(row['station'], row['pac'], row['info.unit']) for row in rows] == [('A', '1200', 'W'),
+                                                                               ('B', '1200.5', 'W')]
+
+    output = str(tmp_path / 'raw')
+    job = ExportJob(api, ['A', 'B'], ParquetSink(output), Checkpoint(str(tmp_path / 'raw.parquet.checkpoint')))
+    assert job.exportRaw('getRawPsExportPowerstationPac') == 2
+    table = pq.read_table(output)
+    assert table.column('pac').to_pylist() == [1200.0, 1200.5]
+    assert table.column('station').to_pylist() == ['A', 'B']
+    assert table.column('info.unit').to_pylist() == ['W', 'W']
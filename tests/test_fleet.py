@@ -0,0 +1,24 @@
+from conftest import makeApi
+from gw_fleet import FleetPoller, isEmpty
+
+
+def test_is_empty():
+    assert isEmpty({}) and isEmpty(None) and isEmpty([])
+    assert isEmpty({'pgrid_w': None, 'status': None, 'inverters': []})
+    assert not isEmpty({'pgrid_w': 0, 'status': None})
+    assert not isEmpty([{}])
+
+
+def test_failed_polls_are_reported_and_not_published(server):
+    published, reports = [], []
+    poller = FleetPoller(makeApi(server), ['A', 'B'], methods=('getCurrentReadings', 'getRawPsPowerFlow'),
+                         interval=0.01, callback=lambda station, results: published.append(station),
+                         onCycle=reports.append)
+    poller.run(cycles=1)
+    assert (reports[-1].polled, reports[-1].failed) == (2, 0)
+    assert sorted(published) == ['A', 'B']
+
+    server.errorRate = 1.0
+    poller.run(cycles=1)
+    assert (reports[-1].polled, reports[-1].failed) == (2, 2)
+    assert len(published) == 2
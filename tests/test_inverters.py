@@ -0,0 +1,39 @@
+import asyncio
+
+from conftest import makeApi
+from gw_async import AsyncGoodWeApi
+from gw_fakeserver import FakeSemsServer
+
+
+def test_inverters_by_sn_are_keyed_by_serial():
+    with FakeSemsServer(inverters=5) as server:
+        api = makeApi(server)
+        serials = ['S-INV{0:02d}'.format(n) for n in range(5)]
+        responses = api.getRawPsInvertersBySn(parallelism=3)
+        assert sorted(responses) == serials
+        assert all(responses[serial]['sn'] == serial and responses[serial]['type'] == 'GW5000D-NS'
+                   for serial in serials)
+        assert server.stats()['endpoints']['PowerStation/GetInverterBySn'] == 5
+
+        given = api.getRawPsInvertersBySn([('S-INV03', 'GW5000D-NS'), {'sn': 'S-INV01', 'type': 'GW5000D-NS'}])
+        assert [response['sn'] for response in given.values()] == ['S-INV03', 'S-INV01']
+        assert len(api.getRawPsInverterKvsBySn()) == 5
+
+
+def test_async_inverters_by_sn():
+    with FakeSemsServer(inverters=4) as server:
+        async def main():
+            return await makeApi(server, cls=AsyncGoodWeApi).getRawPsInvertersBySn()
+
+        responses = asyncio.run(main())
+        assert sorted(responses) == ['S-INV{0:02d}'.format(n) for n in range(4)]
+        assert all(serial == response['sn'] for serial, response in responses.items())
+
+
+def test_current_readings_of_every_inverter():
+    with FakeSemsServer(inverters=3) as server:
+        readings = makeApi(server).getCurrentReadings(allInverters=True)
+        assert [inverter['sn'] for inverter in readings['inverters']] == ['S-INV00', 'S-INV01', 'S-INV02']
+        assert readings['pgrid_w'] == readings['inverters'][0]['pgrid_w']
+        assert all(inverter['grid_voltage'] > 200 for inverter in readings['inverters'])
+        assert 'inverters' not in makeApi(server).getCurrentReadings()
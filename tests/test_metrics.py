@@ -0,0 +1,31 @@
+import socket
+
+from conftest import makeApi
+from gw_metrics import Metrics, TimedHTTPConnection
+
+
+def test_metrics_count_requests(server):
+    api = makeApi(server)
+    metrics = Metrics().install(api)
+    api.getRawPsSoc()
+    api.getRawPsSoc()
+    text = metrics.prometheus()
+    assert 'goodwe_logins_total 1' in text
+    assert 'endpoint="GetSoc"' in text
+
+
+def test_connect_falls_back_to_the_next_address_and_keeps_the_hostname(server, monkeypatch):
+    port = int(server.url.rsplit(':', 1)[1].split('/')[0])
+    getaddrinfo = socket.getaddrinfo
+
+    def fakeGetaddrinfo(host, *args, **kwargs):
+        if host != 'gateway.test':
+            return getaddrinfo(host, *args, **kwargs)
+        # the first address refuses connections, the second one is the fake server
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.2', port)),
+                (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port))]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', fakeGetaddrinfo)
+    connection = TimedHTTPConnection('gateway.test', port, timeout=2)
+    connection._new_conn().close()
+    assert connection._dns_host == 'gateway.test'
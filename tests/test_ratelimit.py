@@ -0,0 +1,62 @@
+import threading
+import time
+
+from conftest import makeApi
+from gw_ratelimit import BACKFILL, INTERACTIVE, LIVE, RequestScheduler
+
+
+def queueRequests(scheduler, requests):
+    '''
+    queueRequests queues (priority, station) requests one after the other on an empty bucket and returns the order
+    in which they are admitted.
+    '''
+    admitted = []
+    threads = []
+    for priority, station in requests:
+        thread = threading.Thread(target=lambda p=priority, s=station: (scheduler.acquire(p, s),
+                                                                        admitted.append((p, s))))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    return admitted, threads
+
+
+def test_priority_order_and_depth():
+    scheduler = RequestScheduler(rate=10, burst=1)
+    scheduler.acquire(LIVE, 'S')
+    admitted, threads = queueRequests(scheduler, [(BACKFILL, 'A'), (INTERACTIVE, 'B'), (LIVE, 'C'), (BACKFILL, 'D')])
+    assert scheduler.depth() == {LIVE: 1, INTERACTIVE: 1, BACKFILL: 2}
+    for thread in threads:
+        thread.join(5)
+    assert admitted == [(LIVE, 'C'), (INTERACTIVE, 'B'), (BACKFILL, 'A'), (BACKFILL, 'D')]
+    assert scheduler.depth() == {LIVE: 0, INTERACTIVE: 0, BACKFILL: 0}
+    assert scheduler.stats()[BACKFILL]['admitted'] == 2
+
+
+def test_round_robin_over_stations():
+    scheduler = RequestScheduler(rate=5, burst=1)
+    scheduler.acquire(BACKFILL, 'S')
+    admitted, threads = queueRequests(scheduler, [(BACKFILL, 'A')] * 3 + [(BACKFILL, 'B')] * 2 + [(BACKFILL, 'C')])
+    for thread in threads:
+        thread.join(5)
+    assert [station for priority, station in admitted] == ['A', 'B', 'C', 'A', 'B', 'A']
+
+
+def test_token_is_taken_after_admission(server):
+    sent = []
+    respond = server.respond
+    server.respond = lambda endpoint, token, form: (sent.append(token), respond(endpoint, token, form))[1]
+    api = makeApi(server)
+    api.getRawPsSoc()
+    renewed = makeApi(server)
+    renewed.getRawPsSoc()
+
+    class Limiter:
+        def acquire(self, priority, station):
+            # another client replaced the token while this request was queued
+            api.tokens.token = renewed.tokens.token
+
+    api.limiter = Limiter()
+    assert api.getRawPsSoc() == {'powerStationId': 'S'}
+    assert sent[-1] == renewed.tokens.token
+    assert server.stats().get('expired', 0) == 0
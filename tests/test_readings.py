@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import gw_vector
+from gw_readings import Readings
+
+
+def entries():
+    return [{'dt': datetime(2020, 6, 1, 12, minute), 'pgrid_w': 1000.0 + minute, 'eday_kwh': minute / 4.0}
+            for minute in range(0, 60, 5)]
+
+
+def test_rows_read_like_entries():
+    readings = Readings.fromEntries(entries())
+    assert len(readings) == 12
+    assert readings.nbytes == 12 * 16
+    assert readings.toEntries() == entries()
+    assert readings[-1]['dt'] == datetime(2020, 6, 1, 12, 55)
+    assert readings[1].pgrid_w == 1005.0 and dict((key, readings[1][key]) for key in readings[1].keys()) == \
+        entries()[1]
+    assert [reading.eday_kwh for reading in readings[2:5]] == [2.5, 3.75, 5.0]
+    with pytest.raises(IndexError):
+        readings[12]
+    with pytest.raises(KeyError):
+        readings[0]['status']
+
+
+def test_from_columns_matches_from_entries():
+    pacs = [{'date': '06/01/2020 12:{0:02d}:00'.format(minute), 'pac': 1000 + minute} for minute in range(0, 60, 5)]
+    columns = gw_vector.integrateDay(datetime(2020, 6, 1), 1.0, pacs)
+    readings = Readings.fromColumns(columns)
+    assert readings.toEntries() == Readings.fromEntries(gw_vector.toEntries(columns)).toEntries()
+
+
+def test_exports_share_memory():
+    readings = Readings.fromEntries(entries())
+    columns = readings.toNumpy()
+    columns['pgrid_w'][0] = 42.0
+    assert readings[0].pgrid_w == 42.0
+    assert (columns['epoch'][1] - columns['epoch'][0]) == 300
+    del columns
+
+    table = readings.toArrow()
+    assert table.num_rows == 12
+    assert table.column('pgrid_w')[0].as_py() == 42.0
+    assert table.column('dt')[0].as_py() == datetime(2020, 6, 1, 12, 0)
+
+
+def test_appending_while_exported_raises():
+    readings = Readings.fromEntries(entries())
+    for export in (readings.toNumpy, readings.toArrow):
+        exported = export()
+        with pytest.raises(BufferError):
+            readings.append(datetime(2020, 6, 1, 13), 0.0, 15.0)
+        with pytest.raises(BufferError):
+            readings.extend(Readings.fromEntries(entries()))
+        del exported
+        assert len(readings) == 12
+
+    readings.append(datetime(2020, 6, 1, 13), 0.0, 15.0)
+    assert len(readings) == 13 and isinstance(readings.toNumpy()['epoch'], np.ndarray)
@@ -0,0 +1,31 @@
+import time
+
+import requests
+
+from conftest import makeApi
+from gw_relay import Relay
+
+
+def test_snapshot_wait_is_validated_and_capped(server):
+    with Relay(makeApi(server), ['S'], interval=60, port=0, maxWait=0.2) as relay:
+        etag = relay.snapshot('S', wait=5)[0]
+        for wait in ('abc', 'nan', 'inf'):
+            assert requests.get(relay.url + 'stations/S?wait=' + wait).status_code == 400
+
+        started = time.monotonic()
+        response = requests.get(relay.url + 'stations/S?wait=3600', headers={'If-None-Match': etag}, timeout=5)
+        assert response.status_code == 304
+        assert time.monotonic() - started < 2
+
+
+def test_failed_polls_keep_the_last_good_snapshot(server):
+    relay = Relay(makeApi(server), ['S'], interval=0.01, port=0)
+    relay.poller.run(cycles=1)
+    good = relay.snapshot('S')
+    assert good is not None
+
+    server.errorRate = 1.0
+    relay.poller.run(cycles=1)
+    relay.publish('S', {'getCurrentReadings': {'pgrid_w': None, 'status': None}, 'getRawPsPowerFlow': {}})
+    assert relay.snapshot('S') == good
+    relay.httpd.server_close()
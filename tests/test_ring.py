@@ -0,0 +1,71 @@
+import multiprocessing
+import time
+
+import pytest
+
+from gw_ring import RingReader, RingWriter
+
+
+def test_latest_and_last(tmp_path):
+    path = str(tmp_path / 'readings.ring')
+    with RingWriter(path, capacity=4) as writer, RingReader(path) as reader:
+        assert reader.latest() is None
+        for n in range(6):
+            writer.publish('S', {'pgrid_w': n, 'eday_kwh': n / 10.0, 'grid_voltage': 230, 'status': 'Normal'},
+                           when=n)
+        latest = reader.latest()
+        assert (latest.station, latest.pgrid_w, latest.status) == ('S', 5.0, 'Normal')
+        assert [record.pgrid_w for record in reader.last(10)] == [2.0, 3.0, 4.0, 5.0]
+        assert reader.read(0) is None
+
+
+def readTorn(path, seconds, queue):
+    reader = RingReader(path)
+    torn = reads = 0
+    stop = time.time() + seconds
+    while time.time() < stop:
+        record = reader.latest()
+        if record is not None:
+            reads += 1
+            torn += record.pgrid_w != 2 * record.eday_kwh
+    queue.put((reads, torn))
+
+
+def test_concurrent_reader_sees_no_torn_records(tmp_path):
+    path = str(tmp_path / 'readings.ring')
+    with RingWriter(path, capacity=8) as writer:
+        writer.publish('S', {'pgrid_w': 0, 'eday_kwh': 0})
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=readTorn, args=(path, 0.5, queue))
+        process.start()
+        n = 0
+        while process.is_alive():
+            n += 1
+            writer.publish('S', {'pgrid_w': 2 * n, 'eday_kwh': n})
+        process.join()
+        reads, torn = queue.get()
+        assert reads > 0 and torn == 0
+
+
+def test_new_writer_leaves_mapped_ring_intact(tmp_path):
+    path = str(tmp_path / 'readings.ring')
+    with RingWriter(path, capacity=64) as writer:
+        for n in range(64):
+            writer.publish('S', {'pgrid_w': n}, when=n)
+    with RingReader(path) as reader, RingWriter(path, capacity=4):
+        assert len(reader.last(64)) == 64
+        with RingReader(path) as fresh:
+            assert fresh.capacity == 4 and fresh.latest() is None
+    assert [name for name in tmp_path.iterdir()] == [tmp_path / 'readings.ring']
+
+
+def test_full_station_ids(tmp_path):
+    path = str(tmp_path / 'readings.ring')
+    stations = ['9a6415bf-cdcc-46af-b393-2b442fa8{0:04d}'.format(n) for n in range(2)]
+    with RingWriter(path, capacity=4) as writer, RingReader(path) as reader:
+        for station in stations:
+            writer.publish(station, {'pgrid_w': 1})
+        assert [record.station for record in reader.last(2)] == stations
+        assert [station.decode() for station in reader.records()['station'][:2]] == stations
+        with pytest.raises(ValueError):
+            writer.publish('S' * 53, {'pgrid_w': 1})
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from gw_history import HistoryStore
+from gw_rollup import RollupStore
+
+
+def samples(day, values):
+    return [{'date': day + ' {0:02d}:{1:02d}:00'.format(minute // 60, minute % 60), 'pac': pac}
+            for minute, pac in values]
+
+
+def test_rollups_of_a_day(tmp_path):
+    with RollupStore(str(tmp_path / 'rollups.sqlite')) as rollups:
+        assert rollups.add('S', samples('06/01/2020', [(600, 0), (660, 1200), (720, 600), (780, 0)])) == 4
+        day = rollups.get('S', 'day', datetime(2020, 6, 1), datetime(2020, 6, 1))
+        assert round(day[0].energy_kwh, 6) == 1.8
+        assert day[0].peak_w == 1200
+        assert day[0].operating_minutes == 120
+        hours = rollups.get('S', 'hour', datetime(2020, 6, 1), datetime(2020, 6, 1, 23))
+        assert [hour.period for hour in hours] == ['2020-06-01 09', '2020-06-01 10', '2020-06-01 11',
+                                                    '2020-06-01 12']
+        assert [round(hour.energy_kwh, 6) for hour in hours] == [0.0, 1.2, 0.6, 0.0]
+
+
+def test_first_sample_and_hour_boundaries(tmp_path):
+    with RollupStore(str(tmp_path / 'rollups.sqlite')) as rollups:
+        rollups.add('S', samples('06/01/2020', [(345, 12), (650, 600), (670, 600)]))
+        hours = rollups.get('S', 'hour', datetime(2020, 6, 1), datetime(2020, 6, 1, 23))
+        assert [(hour.period[-2:], hour.operating_minutes) for hour in hours] == [
+            ('05', 20), ('06', 60), ('07', 60), ('08', 60), ('09', 60), ('10', 60), ('11', 10)]
+        assert round(hours[0].energy_kwh, 6) == 0.151
+        assert round(hours[-1].energy_kwh, 6) == 0.1
+        assert all(hour.operating_minutes <= 60 for hour in hours)
+
+
+def test_adding_again_does_not_double_count(tmp_path):
+    with RollupStore(str(tmp_path / 'rollups.sqlite')) as rollups:
+        morning = samples('06/01/2020', [(600, 600), (660, 1200)])
+        rollups.add('S', morning)
+        assert rollups.add('S', morning) == 0
+        assert rollups.add('S', morning + samples('06/01/2020', [(720, 600)])) == 1
+        rollups.add('S', samples('05/31/2020', [(600, 600)]))
+        month = rollups.get('S', 'month', datetime(2020, 5, 1), datetime(2020, 6, 1))
+        assert [(row.period, round(row.energy_kwh, 3)) for row in month] == [('2020-05', 0.05), ('2020-06', 1.85)]
+
+
+def test_history_feeds_rollups(tmp_path, api):
+    path = str(tmp_path / 'history.sqlite')
+    with RollupStore(path) as rollups, HistoryStore(path, rollups=rollups) as history:
+        history.backfill(api, datetime(2020, 6, 1), datetime(2020, 6, 2))
+        history.putDay('S', datetime(2020, 6, 1), api.getDayReadings(datetime(2020, 6, 1), raw=True))
+        days = rollups.get('S', 'day', datetime(2020, 6, 1), datetime(2020, 6, 2))
+        assert len(days) == 2 and days[0][1:] == days[1][1:]
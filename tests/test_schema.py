@@ -0,0 +1,63 @@
+import pytest
+
+import gw_schema
+from gw_schema import Field, Schema, listOf, mapping, toNumber
+
+
+def test_to_number_units():
+    assert [toNumber(value) for value in ('231.5V', '1200W', '12.3 kWh', '800(W)', '87%', ' -5.5A', '1e3W')] == \
+        [231.5, 1200.0, 12.3, 800.0, 87.0, -5.5, 1000.0]
+    assert [toNumber(value) for value in (12, 1.5, '12.3kWh/m2')] == [12.0, 1.5, 12.3]
+    assert [toNumber(value) for value in ('', 'abc', None, [1], {'v': 1})] == [None] * 5
+
+
+def test_shared_prefixes_are_walked_once():
+    schema = Schema('Shared', [Field('a', ('info', 'a')), Field('b', ('info', 'b')), Field('c', ('info', 'c'))])
+    assert schema.source.count(".get('info')") == 1
+    assert schema.extract({'info': {'a': 1, 'b': 2, 'c': 3}}) == schema.record(1, 2, 3)
+
+
+def test_missing_keys_short_lists_and_defaults():
+    schema = Schema('Nested', [
+        Field('first', ('items', 0, 'value'), toNumber, 0.0),
+        Field('third', ('items', 2, 'value'), toNumber, -1.0),
+        Field('name', ('info', 'name')),
+        Field('deep', ('info', 'deep', 'er'), default='none'),
+    ])
+    record = schema.extract({'items': [{'value': '5W'}, {'value': '6W'}], 'info': {'name': 'x', 'deep': 'flat'}})
+    assert (record.first, record.third, record.name, record.deep) == (5.0, -1.0, 'x', 'none')
+
+    for data in ({}, None, [], {'items': None, 'info': []}, {'items': [None, 'x'], 'info': {'deep': {}}}):
+        record = schema.extract(data)
+        assert (record.first, record.third, record.name, record.deep) == (0.0, -1.0, None, 'none')
+
+
+def test_failed_conversion_falls_back_to_default():
+    schema = Schema('Volts', [Field('volts', ('v',), toNumber, 230.0), Field('raw', ('v',))])
+    assert schema.extract({'v': 'n/a'}) == schema.record(230.0, 'n/a')
+
+
+def test_records_have_slots():
+    record = gw_schema.POWER_FLOW.extract({'pv': '1200(W)', 'load': '800(W)', 'grid': '400(W)', 'soc': 87})
+    assert (record.pv_w, record.load_w, record.grid_w, record.battery_w, record.soc) == (1200.0, 800.0, 400.0, 0.0,
+                                                                                        87.0)
+    with pytest.raises(AttributeError):
+        record.other = 1
+
+
+def test_lists_and_mappings():
+    inverters = listOf(gw_schema.INVERTER)
+    records = inverters([{'sn': 'A', 'status': 1, 'out_pac': 12}, {'sn': 'B', 'status': 7}])
+    assert [(record.sn, record.status, record.pgrid_w) for record in records] == [('A', 'Normal', 12.0),
+                                                                                  ('B', 7, 0.0)]
+    assert inverters(None) == () and inverters({'sn': 'A'}) == ()
+    assert mapping({1: 'one'})(2) == 2
+
+
+def test_current_readings_match_the_dict_parser(server, api):
+    data = api.getRawPsMonitorDetailByPowerstationId()
+    parsed = api.parseCurrentReadings(data, allInverters=True)
+    record = gw_schema.CURRENT_READINGS_ALL.extract(data)
+    for key in ('status', 'pgrid_w', 'eday_kwh', 'etotal_kwh', 'grid_voltage', 'latitude', 'longitude'):
+        assert getattr(record, key) == parsed[key]
+    assert [inverter.sn for inverter in record.inverters] == [inverter['sn'] for inverter in parsed['inverters']]
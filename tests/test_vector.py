@@ -0,0 +1,50 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import gw_vector
+from gw_api import GoodWeApi
+
+
+def randomDay(rng, day, fixedWidth=True):
+    '''
+    randomDay returns the samples of a day with random gaps between them and a random share of zero power.
+    '''
+    samples = []
+    for minute in sorted(rng.sample(range(0, 24 * 60, 5), rng.randint(0, 288))):
+        moment = day + timedelta(minutes=minute)
+        date = moment.strftime('%m/%d/%Y %H:%M:%S') if fixedWidth else '{0}/{1}/{2} {3}:{4:02d}:00'.format(
+            moment.month, moment.day, moment.year, moment.hour, moment.minute)
+        samples.append({'date': date, 'pac': 0 if rng.random() < 0.3 else rng.choice([rng.randint(1, 5000),
+                                                                                       rng.uniform(0, 5000)])})
+    return samples
+
+
+def assertSameEntries(day, eday_kwh, pacs):
+    expected = GoodWeApi.integrateDay(day, eday_kwh, [dict(sample) for sample in pacs])
+    entries = gw_vector.toEntries(gw_vector.integrateDay(day, eday_kwh, [dict(sample) for sample in pacs]))
+    assert [entry['dt'] for entry in entries] == [entry['dt'] for entry in expected]
+    assert [entry['pgrid_w'] for entry in entries] == [entry['pgrid_w'] for entry in expected]
+    assert all(abs(entry['eday_kwh'] - other['eday_kwh']) < 0.0015 for entry, other in zip(entries, expected))
+
+
+def test_matches_the_loop_implementation():
+    rng = random.Random(20200601)
+    for n in range(200):
+        day = datetime(2020, rng.randint(1, 12), rng.randint(1, 28))
+        assertSameEntries(day, rng.choice([0, rng.uniform(0, 40)]), randomDay(rng, day, fixedWidth=n % 4 != 0))
+
+
+def test_edge_days():
+    day = datetime(2020, 6, 1)
+    assertSameEntries(day, 25.0, [])
+    assertSameEntries(day, 25.0, [{'date': '06/01/2020 12:00:00', 'pac': 0}, {'date': '06/01/2020 12:05:00', 'pac': 0}])
+    assertSameEntries(day, 0, [{'date': '06/01/2020 00:00:00', 'pac': 1200}, {'date': '06/01/2020 23:55:00', 'pac': 5}])
+
+
+def test_minutes_of_day():
+    dates = ['06/01/2020 00:00:00', '06/01/2020 09:05:00', '06/01/2020 23:59:59']
+    assert gw_vector.minutesOfDay(dates).tolist() == [0, 545, 1439]
+    assert gw_vector.minutesOfDay(['6/1/2020 9:05:00', '06/01/2020 10:00:00']).tolist() == [545, 600]
+    assert gw_vector.minutesOfDay([]).dtype == np.int64